@@ -23,11 +23,19 @@ import dbus
 import dbus.service
 import dbus.mainloop.glib
 
+import json
 import time
 import os
+from collections import OrderedDict
 
 import repolib
 
+# How long a successful polkit check is trusted for the same caller.
+AUTH_CACHE_TTL = 300
+
+# How many traces to keep for callers which haven't collected them yet.
+MAX_TRACES = 64
+
 class RepomanException(dbus.DBusException):
     _dbus_error_name = 'ro.santopiet.repoman.RepomanException'
 
@@ -37,6 +45,43 @@ class PermissionDeniedByPolicy(dbus.DBusException):
 class AptException(Exception):
     pass
 
+class TraceSpan:
+    """Records the time spent inside it into a list of trace spans."""
+
+    def __init__(self, spans, name, fields):
+        self.spans = spans
+        self.name = name
+        self.fields = fields
+        self.start = None
+
+    def __enter__(self):
+        self.start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        span = dict(self.fields)
+        span.update({
+            'name': self.name,
+            'side': 'daemon',
+            'start': self.start,
+            'end': time.time(),
+            'pid': os.getpid(),
+        })
+        if exc_type is not None:
+            span['error'] = str(exc_value)
+        self.spans.append(span)
+        return False
+
+class NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+NULL_SPAN = NullSpan()
+
 class PPAObject(dbus.service.Object):
 
     def __init__(self, conn=None, object_path=None, bus_name=None):
@@ -46,27 +91,100 @@ class PPAObject(dbus.service.Object):
         self.dbus_info = None
         self.polkit = None
         self.enforce_polkit = True
+        self.auth_cache = {}
+        self.auth_hits = 0
+        self.auth_misses = 0
+        self.watching_names = False
+        # Trace ids set by each caller, and the spans recorded for them
+        self.trace_ids = {}
+        self.traces = OrderedDict()
         # self.sp = SoftwareProperties()
+
+    @dbus.service.method(
+        "ro.santopiet.repoman.Interface",
+        in_signature='', out_signature='',
+        sender_keyword='sender', connection_keyword='conn'
+    )
+    def Ping(self, sender=None, conn=None):
+        """
+        Does nothing, and needs no authorization. Clients call it to start
+        the daemon before they need it.
+        """
+        # Set up the bus proxy _check_polkit_privilege() will need
+        if conn is not None and self.dbus_info is None:
+            self.dbus_info = dbus.Interface(conn.get_object('org.freedesktop.DBus',
+                '/org/freedesktop/DBus/Bus', False), 'org.freedesktop.DBus')
     
+    @dbus.service.method(
+        "ro.santopiet.repoman.Interface",
+        in_signature='s', out_signature='',
+        sender_keyword='sender', connection_keyword='conn'
+    )
+    def SetTraceId(self, trace_id, sender=None, conn=None):
+        """
+        Records spans for the caller's following calls under TRACE_ID, until
+        it's set again. An empty TRACE_ID stops recording. Needs no
+        authorization, since callers only ever see their own spans.
+        """
+        if sender is None:
+            return
+        if trace_id:
+            self.trace_ids[sender] = trace_id
+            self._watch_name_owners(conn)
+        else:
+            self.trace_ids.pop(sender, None)
+
+    @dbus.service.method(
+        "ro.santopiet.repoman.Interface",
+        in_signature='s', out_signature='s',
+        sender_keyword='sender', connection_keyword='conn'
+    )
+    def GetTraceSpans(self, trace_id, sender=None, conn=None):
+        """
+        Returns the spans the caller's calls recorded under TRACE_ID as a
+        JSON list, and forgets them.
+        """
+        return json.dumps(self.traces.pop((sender, trace_id), []))
+
+    def _trace(self, sender, name, **fields):
+        """
+        Returns a context manager recording a span called NAME for SENDER's
+        current trace, or one which does nothing if SENDER isn't tracing.
+        """
+        trace_id = self.trace_ids.get(sender)
+        if trace_id is None:
+            return NULL_SPAN
+        key = (sender, trace_id)
+        spans = self.traces.get(key)
+        if spans is None:
+            spans = self.traces[key] = []
+            while len(self.traces) > MAX_TRACES:
+                self.traces.popitem(last=False)
+        fields['trace'] = trace_id
+        return TraceSpan(spans, name, fields)
+
     @dbus.service.method(
         "ro.santopiet.repoman.Interface",
         in_signature='s', out_signature='i',
         sender_keyword='sender', connection_keyword='conn'
     )
     def AddRepo(self, line, sender=None, conn=None):
-        self._check_polkit_privilege(
-            sender, conn, 'ro.santopiet.repoman.modppa'
-        )
-        # PPA Add code here
-        try:
-            if line.startswith('deb'):
-                new_source = repolib.DebLine(line)
-            elif line.startswith('ppa:'):
-                new_source = repolib.PPALine(line)
-            new_source.save_to_disk()
-            return 0
-        except:
-            raise AptException("Could not Add the APT Source")
+        with self._trace(sender, 'AddRepo'):
+            self._check_polkit_privilege(
+                sender, conn, 'ro.santopiet.repoman.modppa'
+            )
+            # PPA Add code here
+            try:
+                with self._trace(sender, 'mutate'):
+                    if line.startswith('deb'):
+                        new_source = repolib.DebLine(line)
+                    elif line.startswith('ppa:'):
+                        new_source = repolib.PPALine(line)
+                with self._trace(sender, 'save'):
+                    new_source.save_to_disk()
+                return 0
+            except:
+                raise AptException("Could not Add the APT Source")
     
     @dbus.service.method(
         "ro.santopiet.repoman.Interface",
@@ -74,24 +192,27 @@ class PPAObject(dbus.service.Object):
         sender_keyword='sender', connection_keyword='conn'
     )
     def AddFullRepo(self, name, uris, suites, components, code, sender=None, conn=None):
-        self._check_polkit_privilege(
-            sender, conn, 'ro.santopiet.repoman.modppa'
-        )
-        # PPA Add code here
-        try:
-            new_source = repolib.Source(
-                name=name,
-                uris=uris.split(),
-                suites=suites.split(),
-                components=components.split(),
+        with self._trace(sender, 'AddFullRepo'):
+            self._check_polkit_privilege(
+                sender, conn, 'ro.santopiet.repoman.modppa'
             )
-            new_source.set_source_enabled(code)
-            new_source.filename = name.translate(repolib.util.CLEAN_CHARS)
-            new_source.filename += '.sources'
-            new_source.save_to_disk()
-            return 0
-        except:
-            raise AptException("Could not remove the APT Source")
+            # PPA Add code here
+            try:
+                with self._trace(sender, 'mutate'):
+                    new_source = repolib.Source(
+                        name=name,
+                        uris=uris.split(),
+                        suites=suites.split(),
+                        components=components.split(),
+                    )
+                    new_source.set_source_enabled(code)
+                    new_source.filename = name.translate(repolib.util.CLEAN_CHARS)
+                    new_source.filename += '.sources'
+                with self._trace(sender, 'save'):
+                    new_source.save_to_disk()
+                return 0
+            except:
+                raise AptException("Could not remove the APT Source")
     
     @dbus.service.method(
         "ro.santopiet.repoman.Interface",
@@ -99,15 +220,17 @@ class PPAObject(dbus.service.Object):
         sender_keyword='sender', connection_keyword='conn'
     )
     def DelRepo(self, filename, sender=None, conn=None):
-        self._check_polkit_privilege(
-            sender, conn, 'ro.santopiet.repoman.modppa'
-        )
-        # PPA Remove code here
-        try:
-            os.remove(filename)
-            return 0
-        except:
-            raise AptException("Could not remove the APT Source")
+        with self._trace(sender, 'DelRepo'):
+            self._check_polkit_privilege(
+                sender, conn, 'ro.santopiet.repoman.modppa'
+            )
+            # PPA Remove code here
+            try:
+                with self._trace(sender, 'save', file=filename):
+                    os.remove(filename)
+                return 0
+            except:
+                raise AptException("Could not remove the APT Source")
     
     @dbus.service.method(
         "ro.santopiet.repoman.Interface",
@@ -115,20 +238,24 @@ class PPAObject(dbus.service.Object):
         sender_keyword='sender', connection_keyword='conn'
     )
     def AddComp(self, repo, comp, sender=None, conn=None):
-        self._check_polkit_privilege(
-            sender, conn, 'ro.santopiet.repoman.modppa'
-        )
-        
-        try:
-            source = repolib.Source()
-            source.load_from_file(filename='{}.sources'.format(repo))
-            if not comp in source.components:
-                source.components.append(comp)
-            source.components.sort()
-            source.save_to_disk()
-            return 0
-        except:
-            raise AptException("Could not add %s to source %s" % (comp, repo))
+        filename = '{}.sources'.format(repo)
+        with self._trace(sender, 'AddComp'):
+            self._check_polkit_privilege(
+                sender, conn, 'ro.santopiet.repoman.modppa'
+            )
+            try:
+                with self._trace(sender, 'load', file=filename):
+                    source = repolib.Source()
+                    source.load_from_file(filename=filename)
+                with self._trace(sender, 'mutate', file=filename):
+                    if not comp in source.components:
+                        source.components.append(comp)
+                    source.components.sort()
+                with self._trace(sender, 'save', file=filename):
+                    source.save_to_disk()
+                return 0
+            except:
+                raise AptException("Could not add %s to source %s" % (comp, repo))
     
     @dbus.service.method(
         "ro.santopiet.repoman.Interface",
@@ -136,20 +263,24 @@ class PPAObject(dbus.service.Object):
         sender_keyword='sender', connection_keyword='conn'
     )
     def DelComp(self, repo, comp, sender=None, conn=None):
-        self._check_polkit_privilege(
-            sender, conn, 'ro.santopiet.repoman.modppa'
-        )
-        
-        try:
-            source = repolib.Source()
-            source.load_from_file(filename='{}.sources'.format(repo))
-            if comp in source.components:
-                source.components.remove(comp)
-            source.components.sort()
-            source.save_to_disk()
-            return 0
-        except:
-            raise AptException("Could not add %s to source %s" % (comp, repo))
+        filename = '{}.sources'.format(repo)
+        with self._trace(sender, 'DelComp'):
+            self._check_polkit_privilege(
+                sender, conn, 'ro.santopiet.repoman.modppa'
+            )
+            try:
+                with self._trace(sender, 'load', file=filename):
+                    source = repolib.Source()
+                    source.load_from_file(filename=filename)
+                with self._trace(sender, 'mutate', file=filename):
+                    if comp in source.components:
+                        source.components.remove(comp)
+                    source.components.sort()
+                with self._trace(sender, 'save', file=filename):
+                    source.save_to_disk()
+                return 0
+            except:
+                raise AptException("Could not add %s to source %s" % (comp, repo))
     
     @dbus.service.method(
         "ro.santopiet.repoman.Interface",
@@ -157,20 +288,24 @@ class PPAObject(dbus.service.Object):
         sender_keyword='sender', connection_keyword='conn'
     )
     def AddSuite(self, repo, suite, sender=None, conn=None):
-        self._check_polkit_privilege(
-            sender, conn, 'ro.santopiet.repoman.modppa'
-        )
-        
-        try:
-            source = repolib.Source()
-            source.load_from_file(filename='{}.sources'.format(repo))
-            if not suite in source.suites:
-                source.suites.append(suite)
-            source.suites.sort()
-            source.save_to_disk()
-            return 0
-        except:
-            raise AptException("Could not add %s to source %s" % (comp, repo))
+        filename = '{}.sources'.format(repo)
+        with self._trace(sender, 'AddSuite'):
+            self._check_polkit_privilege(
+                sender, conn, 'ro.santopiet.repoman.modppa'
+            )
+            try:
+                with self._trace(sender, 'load', file=filename):
+                    source = repolib.Source()
+                    source.load_from_file(filename=filename)
+                with self._trace(sender, 'mutate', file=filename):
+                    if not suite in source.suites:
+                        source.suites.append(suite)
+                    source.suites.sort()
+                with self._trace(sender, 'save', file=filename):
+                    source.save_to_disk()
+                return 0
+            except:
+                raise AptException("Could not add %s to source %s" % (comp, repo))
     
     @dbus.service.method(
         "ro.santopiet.repoman.Interface",
@@ -178,20 +313,24 @@ class PPAObject(dbus.service.Object):
         sender_keyword='sender', connection_keyword='conn'
     )
     def DelSuite(self, repo, suite, sender=None, conn=None):
-        self._check_polkit_privilege(
-            sender, conn, 'ro.santopiet.repoman.modppa'
-        )
-        
-        try:
-            source = repolib.Source()
-            source.load_from_file(filename='{}.sources'.format(repo))
-            if suite in source.suites:
-                source.suites.remove(suite)
-            source.suites.sort()
-            source.save_to_disk()
-            return 0
-        except:
-            raise AptException("Could not add %s to source %s" % (comp, repo))
+        filename = '{}.sources'.format(repo)
+        with self._trace(sender, 'DelSuite'):
+            self._check_polkit_privilege(
+                sender, conn, 'ro.santopiet.repoman.modppa'
+            )
+            try:
+                with self._trace(sender, 'load', file=filename):
+                    source = repolib.Source()
+                    source.load_from_file(filename=filename)
+                with self._trace(sender, 'mutate', file=filename):
+                    if suite in source.suites:
+                        source.suites.remove(suite)
+                    source.suites.sort()
+                with self._trace(sender, 'save', file=filename):
+                    source.save_to_disk()
+                return 0
+            except:
+                raise AptException("Could not add %s to source %s" % (comp, repo))
     
     @dbus.service.method(
         "ro.santopiet.repoman.Interface",
@@ -199,18 +338,22 @@ class PPAObject(dbus.service.Object):
         sender_keyword='sender', connection_keyword='conn'
     )
     def SetSource(self, repo, state, sender=None, conn=None):
-        self._check_polkit_privilege(
-            sender, conn, 'ro.santopiet.repoman.modppa'
-        )
-        
-        try:
-            source = repolib.Source()
-            source.load_from_file(filename='{}.sources'.format(repo))
-            source.set_source_enabled(state)
-            source.save_to_disk()
-            return 0
-        except:
-            raise AptException("Could not add %s to source %s" % (comp, repo))
+        filename = '{}.sources'.format(repo)
+        with self._trace(sender, 'SetSource'):
+            self._check_polkit_privilege(
+                sender, conn, 'ro.santopiet.repoman.modppa'
+            )
+            try:
+                with self._trace(sender, 'load', file=filename):
+                    source = repolib.Source()
+                    source.load_from_file(filename=filename)
+                with self._trace(sender, 'mutate', file=filename):
+                    source.set_source_enabled(state)
+                with self._trace(sender, 'save', file=filename):
+                    source.save_to_disk()
+                return 0
+            except:
+                raise AptException("Could not add %s to source %s" % (comp, repo))
     
     @dbus.service.method(
         "ro.santopiet.repoman.Interface",
@@ -218,24 +361,119 @@ class PPAObject(dbus.service.Object):
         sender_keyword='sender', connection_keyword='conn'
     )
     def SetModifiedRepo(self, name, enabled, source_code, uris, suites, components, filename, sender=None, conn=None):
-        self._check_polkit_privilege(
-            sender, conn, 'ro.santopiet.repoman.modppa'
-        )
-        # PPA Modify code here
-        try:
-            source = repolib.Source(filename=filename)
-            source.load_from_file()
-            source.name=name
-            source.set_enabled(enabled)
-            source.uris=uris.split()
-            source.suites=suites.split()
-            source.components=components.split()
-            source.set_source_enabled(source_code)
-            source.save_to_disk()
-            return 0
-        except:
-            raise AptException("Could not modify the APT Source")
+        with self._trace(sender, 'SetModifiedRepo'):
+            self._check_polkit_privilege(
+                sender, conn, 'ro.santopiet.repoman.modppa'
+            )
+            # PPA Modify code here
+            try:
+                with self._trace(sender, 'load', file=filename):
+                    source = repolib.Source(filename=filename)
+                    source.load_from_file()
+                with self._trace(sender, 'mutate', file=filename):
+                    source.name=name
+                    source.set_enabled(enabled)
+                    source.uris=uris.split()
+                    source.suites=suites.split()
+                    source.components=components.split()
+                    source.set_source_enabled(source_code)
+                with self._trace(sender, 'save', file=filename):
+                    source.save_to_disk()
+                return 0
+            except:
+                raise AptException("Could not modify the APT Source")
     
+    @dbus.service.method(
+        "ro.santopiet.repoman.Interface",
+        in_signature='a(sss)', out_signature='a(is)',
+        sender_keyword='sender', connection_keyword='conn'
+    )
+    def ApplyTransaction(self, operations, sender=None, conn=None):
+        """
+        Applies a list of (action, filename, value) operations in order.
+
+        Each affected source file is loaded once, has all of its operations
+        applied in memory, and is then saved once; a remove deletes the file
+        straight away. Returns a (code, message) result for each operation,
+        where a code of 0 means success.
+        """
+        with self._trace(sender, 'ApplyTransaction', operations=len(operations)):
+            self._check_polkit_privilege(
+                sender, conn, 'ro.santopiet.repoman.modppa'
+            )
+            return self._apply_transaction(operations, sender)
+
+    def _apply_transaction(self, operations, sender):
+        sources = {}
+        load_errors = {}
+        results = []
+        touched = {}
+        for index, (action, filename, value) in enumerate(operations):
+            if action == 'remove':
+                try:
+                    with self._trace(sender, 'save', file=filename):
+                        os.remove(filename)
+                    results.append((0, ''))
+                except Exception as err:
+                    results.append((1, "Could not remove %s: %s" % (filename, err)))
+                    continue
+                # Anything else done to the file before is moot now
+                sources.pop(filename, None)
+                touched.pop(filename, None)
+                continue
+            if filename not in sources and filename not in load_errors:
+                try:
+                    with self._trace(sender, 'load', file=filename):
+                        source = repolib.Source()
+                        source.load_from_file(filename=filename)
+                    sources[filename] = source
+                except Exception as err:
+                    load_errors[filename] = "Could not load %s: %s" % (filename, err)
+            if filename in load_errors:
+                results.append((1, load_errors[filename]))
+                continue
+            try:
+                with self._trace(sender, 'mutate', file=filename, action=action):
+                    self._apply_operation(sources[filename], action, value)
+                results.append((0, ''))
+                touched.setdefault(filename, []).append(index)
+            except Exception as err:
+                results.append((1, "Could not %s %s on %s: %s" % (action, value, filename, err)))
+
+        for filename, indices in touched.items():
+            try:
+                with self._trace(sender, 'save', file=filename):
+                    sources[filename].save_to_disk()
+            except Exception as err:
+                for index in indices:
+                    results[index] = (1, "Could not save %s: %s" % (filename, err))
+        return results
+
+    @classmethod
+    def _apply_operation(klass, source, action, value):
+        # Work on copies and assign them back, so this doesn't depend on
+        # whether repolib hands out its own lists or fresh ones.
+        if action in ('add-comp', 'del-comp'):
+            components = list(source.components)
+            if action == 'add-comp' and not value in components:
+                components.append(value)
+            elif action == 'del-comp' and value in components:
+                components.remove(value)
+            source.components = sorted(components)
+        elif action in ('add-suite', 'del-suite'):
+            suites = list(source.suites)
+            if action == 'add-suite' and not value in suites:
+                suites.append(value)
+            elif action == 'del-suite' and value in suites:
+                suites.remove(value)
+            source.suites = sorted(suites)
+        elif action == 'set-source':
+            source.set_source_enabled(value == 'true')
+        elif action == 'set-enabled':
+            source.set_enabled(value == 'true')
+        else:
+            raise RepomanException("Unknown action %s" % action)
+
     @dbus.service.method(
         "ro.santopiet.repoman.Interface",
         in_signature='sb', out_signature='i',
@@ -271,6 +509,18 @@ class PPAObject(dbus.service.Object):
         )
         return 0
 
+    @dbus.service.method(
+        "ro.santopiet.repoman.Interface",
+        in_signature='', out_signature='a{su}',
+        sender_keyword='sender', connection_keyword='conn'
+    )
+    def GetAuthCacheStats(self, sender=None, conn=None):
+        return {
+            'hits': dbus.UInt32(self.auth_hits),
+            'misses': dbus.UInt32(self.auth_misses),
+            'size': dbus.UInt32(len(self.auth_cache)),
+        }
+
     @dbus.service.method(
         "ro.santopiet.repoman.Interface",
         in_signature='', out_signature='',
@@ -304,6 +554,10 @@ class PPAObject(dbus.service.Object):
         return source
 
     def _check_polkit_privilege(self, sender, conn, privilege):
+        with self._trace(sender, 'polkit check', privilege=privilege):
+            self._check_polkit(sender, conn, privilege)
+
+    def _check_polkit(self, sender, conn, privilege):
         # from jockey
         '''Verify that sender has a given PolicyKit privilege.
 
@@ -328,6 +582,19 @@ class PPAObject(dbus.service.Object):
             self.dbus_info = dbus.Interface(conn.get_object('org.freedesktop.DBus',
                 '/org/freedesktop/DBus/Bus', False), 'org.freedesktop.DBus')
         pid = self.dbus_info.GetConnectionUnixProcessID(sender)
+        start_time = PPAObject._get_process_start_time(pid)
+
+        # A unique bus name is never reused, and (pid, start-time) pins down
+        # the process, so a recent answer for the same key is still good.
+        cache_key = (sender, pid, start_time, privilege)
+        expires = self.auth_cache.get(cache_key)
+        if expires is not None:
+            if expires > time.monotonic():
+                self.auth_hits += 1
+                return
+            del self.auth_cache[cache_key]
+        self.auth_misses += 1
+        self._watch_name_owners(conn)
         
         # query PolicyKit
         if self.polkit is None:
@@ -339,13 +606,13 @@ class PPAObject(dbus.service.Object):
             # we don't need is_challenge return here, since we call with AllowUserInteraction
             (is_auth, _, details) = self.polkit.CheckAuthorization(
                     ('unix-process', {'pid': dbus.UInt32(pid, variant_level=1),
-                    'start-time': dbus.UInt64(0, variant_level=1)}), 
+                    'start-time': dbus.UInt64(start_time, variant_level=1)}), 
                     privilege, {'': ''}, dbus.UInt32(1), '', timeout=600)
         except dbus.DBusException as e:
             if e._dbus_error_name == 'org.freedesktop.DBus.Error.ServiceUnknown':
                 # polkitd timed out, connect again
                 self.polkit = None
-                return self._check_polkit_privilege(sender, conn, privilege)
+                return self._check_polkit(sender, conn, privilege)
             else:
                 raise
 
@@ -354,11 +621,60 @@ class PPAObject(dbus.service.Object):
                     (sender, conn, pid, privilege, str(details)))
             raise PermissionDeniedByPolicy(privilege)
 
+        self.auth_cache[cache_key] = time.monotonic() + AUTH_CACHE_TTL
+
+    def _watch_name_owners(self, conn):
+        """Drop cached authorizations and traces when their sender leaves the bus."""
+        if self.watching_names:
+            return
+        conn.add_signal_receiver(
+            self._on_name_owner_changed,
+            signal_name='NameOwnerChanged',
+            dbus_interface='org.freedesktop.DBus',
+            bus_name='org.freedesktop.DBus',
+            path='/org/freedesktop/DBus'
+        )
+        self.watching_names = True
+
+    def _on_name_owner_changed(self, name, old_owner, new_owner):
+        if new_owner or not name.startswith(':'):
+            return
+        for key in [key for key in self.auth_cache if key[0] == name]:
+            del self.auth_cache[key]
+        self.trace_ids.pop(name, None)
+        for key in [key for key in self.traces if key[0] == name]:
+            del self.traces[key]
+
+    @classmethod
+    def _get_process_start_time(klass, pid):
+        """Returns the start time of PID in clock ticks since boot."""
+        try:
+            with open('/proc/%i/stat' % pid) as stat_file:
+                stat = stat_file.read()
+        except OSError:
+            return 0
+        # The command name can contain spaces, so split after it. starttime is
+        # field 22, which is the 20th after the name.
+        return int(stat.rsplit(')', 1)[1].split()[19])
+
+
+def preload():
+    """
+    Loads what the first request will need before the bus name is claimed,
+    so the client's first call doesn't wait for it.
+    """
+    try:
+        system_source = repolib.SystemSource()
+        system_source.load_from_file()
+    except Exception as err:
+        PPAObject._log_in_file('/tmp/repoman.log', 'preload: %s' % err)
+
 
 if __name__ == '__main__':
     dbus.mainloop.glib.DBusGMainLoop(set_as_default=True)
     
     bus = dbus.SystemBus()
+    preload()
     name = dbus.service.BusName("ro.santopiet.repoman", bus)
     object = PPAObject(bus, '/PPAObject')
 
@@ -0,0 +1,73 @@
+#!/usr/bin/python3
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk
+
+from .changes import change_set
+
+import gettext
+gettext.bindtextdomain('repoman', '/usr/share/repoman/po')
+gettext.textdomain("repoman")
+_ = gettext.gettext
+
+class ChangeBar(Gtk.Revealer):
+    """
+    Shows how many changes are staged, with buttons to apply or revert them.
+    Hidden while nothing is staged.
+    """
+
+    def __init__(self):
+        Gtk.Revealer.__init__(self)
+        self.set_transition_type(Gtk.RevealerTransitionType.SLIDE_DOWN)
+
+        self.info_bar = Gtk.InfoBar()
+        self.info_bar.set_message_type(Gtk.MessageType.QUESTION)
+        self.add(self.info_bar)
+
+        self.pending_label = Gtk.Label()
+        self.pending_label.set_halign(Gtk.Align.START)
+        self.info_bar.get_content_area().add(self.pending_label)
+
+        self.info_bar.add_button(_("Revert"), Gtk.ResponseType.REJECT)
+        apply_button = self.info_bar.add_button(_("Apply"), Gtk.ResponseType.APPLY)
+        Gtk.StyleContext.add_class(apply_button.get_style_context(),
+                                   "suggested-action")
+        self.info_bar.connect('response', self.on_response)
+
+        change_set.connect('changed', self.on_changes_changed)
+
+    def on_changes_changed(self, change_set, pending):
+        if pending:
+            self.pending_label.set_text(gettext.ngettext(
+                "%d change not yet applied",
+                "%d changes not yet applied",
+                pending
+            ) % pending)
+        self.set_reveal_child(pending > 0)
+
+    def on_response(self, info_bar, response):
+        if response == Gtk.ResponseType.APPLY:
+            change_set.apply()
+        elif response == Gtk.ResponseType.REJECT:
+            change_set.revert()
@@ -0,0 +1,274 @@
+#!/usr/bin/python3
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+
+import logging
+import os
+from collections import OrderedDict
+
+from gi.repository import GObject, GLib
+
+from .repo import Repo
+from .tracing import tracer
+
+# How changes to the system source are written, picked with --apply-mode or
+# REPOMAN_APPLY_MODE:
+#   immediate - each change is sent as soon as it's made (the default)
+#   delay     - changes are staged and sent together once they stop coming
+#   manual    - changes are staged until they're applied from the bar
+APPLY_MODES = ('immediate', 'delay', 'manual')
+APPLY_MODE = os.environ.get('REPOMAN_APPLY_MODE', 'immediate')
+if not APPLY_MODE in APPLY_MODES:
+    APPLY_MODE = 'immediate'
+
+# Milliseconds to wait after the last change before applying in delay mode
+APPLY_DELAY = 1500
+
+class ChangeSet(GObject.GObject):
+    """
+    Collects pending (action, filename, value) operations and sends them to
+    the daemon as one ApplyTransaction, so each file is written once however
+    many changes were made.
+
+    Each change is staged under a KEY (e.g. the widget which made it); staging
+    again under the same key replaces it, and unstage() drops it. The
+    "changed" signal carries the number of staged changes, and "failed" a
+    message for any changes which couldn't be applied.
+    """
+
+    __gsignals__ = {
+        'changed': (GObject.SignalFlags.RUN_FIRST, None, (int,)),
+        'failed': (GObject.SignalFlags.RUN_FIRST, None, (str,)),
+    }
+
+    def __init__(self, mode=APPLY_MODE, delay=APPLY_DELAY):
+        GObject.GObject.__init__(self)
+        self.mode = mode
+        self.delay = delay
+        self.staged = OrderedDict()
+        self.timeout = None
+        self.in_flight = 0
+        self.waiters = []
+        self.waiters_succeeded = True
+        self.repo = Repo()
+
+        self.log = logging.getLogger('repoman.ChangeSet')
+        handler = logging.StreamHandler()
+        formatter = logging.Formatter('%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
+        handler.setFormatter(formatter)
+        self.log.addHandler(handler)
+        self.log.setLevel(logging.WARNING)
+
+    def set_mode(self, mode):
+        """
+        Switches to MODE, one of APPLY_MODES.
+        """
+        if not mode in APPLY_MODES:
+            raise ValueError(mode)
+        self.mode = mode
+        if mode == 'immediate':
+            self.apply()
+
+    def stage(self, key, operation, on_done=None, on_revert=None):
+        """
+        Stages OPERATION under KEY.
+
+        ON_DONE() is called once it has been applied. ON_REVERT() is called
+        if it is reverted or fails, to put the UI back.
+        """
+        self.staged.pop(key, None)
+        self.staged[key] = (operation, on_done, on_revert)
+        self.log.debug('Staged %s', operation)
+        if self.mode == 'immediate':
+            self.apply()
+            return
+        if self.mode == 'delay':
+            self._cancel_timeout()
+            self.timeout = GLib.timeout_add(self.delay, self._on_timeout)
+        self.emit('changed', len(self.staged))
+
+    def unstage(self, key):
+        """
+        Drops the change staged under KEY, if there is one, without calling
+        either of its callbacks.
+        """
+        if self.staged.pop(key, None) is None:
+            return
+        if not self.staged:
+            self._cancel_timeout()
+        self.emit('changed', len(self.staged))
+
+    def is_staged(self, key):
+        return key in self.staged
+
+    def apply(self):
+        """
+        Sends every staged change in a single privileged call.
+        """
+        self._cancel_timeout()
+        if not self.staged:
+            return
+        entries = list(self.staged.values())
+        self.staged.clear()
+        self.emit('changed', 0)
+        self.in_flight += 1
+        trace_id = tracer.new_trace_id()
+
+        def on_reply(results):
+            messages = []
+            with tracer.span(trace_id, 'ui update'):
+                for (operation, on_done, on_revert), (code, message) in zip(entries, results):
+                    if code == 0:
+                        if on_done:
+                            on_done()
+                    else:
+                        messages.append(str(message))
+                        if on_revert:
+                            on_revert()
+            if messages:
+                self.emit('failed', '\n'.join(messages))
+            self._finish_transaction(not messages)
+
+        def on_error(error):
+            for operation, on_done, on_revert in entries:
+                if on_revert:
+                    on_revert()
+            self.emit('failed', error.get_dbus_message() or str(error))
+            self._finish_transaction(False)
+
+        self.repo.apply_transaction(
+            [operation for operation, on_done, on_revert in entries],
+            reply_handler=on_reply,
+            error_handler=on_error,
+            trace_id=trace_id
+        )
+
+    def wait(self, on_finished):
+        """
+        Calls ON_FINISHED(succeeded) once every change sent so far has been
+        answered, straight away if none are on their way.
+        """
+        self.waiters.append(on_finished)
+        self._wake_waiters()
+
+    def _finish_transaction(self, succeeded):
+        self.in_flight -= 1
+        self.waiters_succeeded = self.waiters_succeeded and succeeded
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        if self.in_flight:
+            return
+        waiters, self.waiters = self.waiters, []
+        succeeded, self.waiters_succeeded = self.waiters_succeeded, True
+        for waiter in waiters:
+            waiter(succeeded)
+
+    def revert(self):
+        """
+        Drops every staged change and puts the UI back.
+        """
+        self._cancel_timeout()
+        entries = list(self.staged.values())
+        self.staged.clear()
+        for operation, on_done, on_revert in entries:
+            if on_revert:
+                on_revert()
+        self.emit('changed', 0)
+
+    def _on_timeout(self):
+        self.timeout = None
+        self.apply()
+        return False
+
+    def _cancel_timeout(self):
+        if self.timeout:
+            GLib.source_remove(self.timeout)
+            self.timeout = None
+
+change_set = ChangeSet()
+
+class SourceWidgets:
+    """
+    Keeps track of the widgets on a page which change the system source.
+
+    A change the user makes to a widget is staged in the change set, and the
+    widget is put back if the change is reverted or fails. Widgets with a
+    change staged or in flight are left alone by set_state(), so a refresh
+    of the system model can't flip them back under the user.
+    """
+
+    def __init__(self, filename='system.sources'):
+        self.filename = filename
+        self.handlers = {}
+        self.confirmed_states = {}
+        self.pending = set()
+
+    def watch(self, widget, signal, callback):
+        """
+        Connects CALLBACK to SIGNAL on WIDGET and remembers its current state
+        so it can be put back if a change fails.
+        """
+        self.handlers[widget] = widget.connect(signal, callback)
+        self.confirmed_states[widget] = widget.get_active()
+
+    def set_state(self, widget, state):
+        """
+        Sets WIDGET to STATE without treating it as a change by the user.
+        """
+        if widget in self.pending:
+            return
+        self._set_active(widget, state)
+        self.confirmed_states[widget] = state
+
+    def stage(self, widget, action, value):
+        """
+        Stages ACTION for the change the user just made to WIDGET. Putting
+        the widget back before the change is applied just drops it.
+        """
+        state = widget.get_active()
+        if change_set.is_staged(widget) and state == self.confirmed_states[widget]:
+            change_set.unstage(widget)
+            self.pending.discard(widget)
+            return
+        self.pending.add(widget)
+
+        def on_done():
+            if not change_set.is_staged(widget):
+                self.pending.discard(widget)
+            self.confirmed_states[widget] = state
+
+        def on_revert():
+            if not change_set.is_staged(widget):
+                self.pending.discard(widget)
+            self._set_active(widget, self.confirmed_states[widget])
+
+        change_set.stage(
+            widget,
+            (action, self.filename, value),
+            on_done=on_done,
+            on_revert=on_revert
+        )
+
+    def _set_active(self, widget, state):
+        widget.handler_block(self.handlers[widget])
+        widget.set_active(state)
+        widget.handler_unblock(self.handlers[widget])
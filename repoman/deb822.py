@@ -0,0 +1,150 @@
+#!/usr/bin/python3
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+import os
+import sys
+import urllib.parse
+
+# deb822 field names are case-insensitive; these are the ones the list needs.
+SUMMARY_FIELDS = {
+    'x-repolib-name': 'name',
+    'enabled': 'enabled',
+    'types': 'types',
+    'uris': 'uris',
+    'suites': 'suites',
+    'components': 'components',
+}
+
+FLAG_BINARY = 1
+FLAG_SOURCE_CODE = 2
+
+class SourceSummary:
+    """
+    What the list needs to know about one source, kept small since there's
+    one per file. Strings which repeat between sources (hosts, suites and
+    components) are interned so they're only stored once.
+    """
+
+    __slots__ = ('path', 'name', 'enabled', 'flags', 'host', 'uris', 'suites',
+                 'components')
+
+    def __init__(self, path, name, enabled, flags, uris, suites, components):
+        self.path = path
+        self.name = name
+        self.enabled = enabled
+        self.flags = flags
+        self.uris = tuple(uris)
+        self.suites = tuple(sys.intern(suite) for suite in suites)
+        self.components = tuple(sys.intern(comp) for comp in components)
+        self.host = ''
+        if self.uris:
+            self.host = sys.intern(urllib.parse.urlsplit(self.uris[0]).hostname or '')
+
+    @property
+    def source_code_enabled(self):
+        return bool(self.flags & FLAG_SOURCE_CODE)
+
+    def to_dict(self):
+        return {
+            'path': self.path,
+            'name': self.name,
+            'enabled': self.enabled,
+            'flags': self.flags,
+            'uris': self.uris,
+            'suites': self.suites,
+            'components': self.components,
+        }
+
+    @classmethod
+    def from_dict(klass, data):
+        return klass(
+            data['path'], data['name'], data['enabled'], data['flags'],
+            data['uris'], data['suites'], data['components']
+        )
+
+def _scan_lines(lines):
+    """
+    Returns the summary fields found in the first stanza of LINES.
+    """
+    fields = {}
+    current = None
+    for line in lines:
+        if line.startswith('#'):
+            continue
+        if not line.strip():
+            if fields:
+                break
+            current = None
+            continue
+        if line[0] in ' \t':
+            # Continuation of the previous field
+            if current:
+                fields[current] += ' ' + line.strip()
+            continue
+        key, sep, value = line.partition(':')
+        if not sep:
+            current = None
+            continue
+        current = SUMMARY_FIELDS.get(key.strip().lower())
+        if current:
+            fields[current] = value.strip()
+    return fields
+
+def scan_source(path, text=None):
+    """
+    Reads the first stanza of the deb822 file at PATH in a single pass.
+
+    If the caller already has the contents of the file, it can pass them in
+    TEXT and the file isn't opened.
+
+    Returns a SourceSummary with the name, enabled state, types, uris, suites
+    and components of the source; this is all the list needs, so no
+    repolib.Source is built.
+    Comments and any later stanzas are ignored, the same as repolib does.
+    """
+    if text is None:
+        with open(path) as source_file:
+            fields = _scan_lines(source_file)
+    else:
+        fields = _scan_lines(text.splitlines())
+
+    name = fields.get('name', '')
+    if not name:
+        name = os.path.basename(path).replace('.sources', '')
+    uris = fields.get('uris', '').split()
+    suites = fields.get('suites', '').split()
+    # Like repolib, a source with nowhere to fetch from can't be enabled.
+    enabled = fields.get('enabled', 'yes').lower() != 'no'
+    flags = 0
+    for source_type in fields.get('types', '').split():
+        if source_type == 'deb':
+            flags |= FLAG_BINARY
+        elif source_type == 'deb-src':
+            flags |= FLAG_SOURCE_CODE
+    return SourceSummary(
+        path,
+        name,
+        enabled and bool(uris) and bool(suites),
+        flags,
+        uris,
+        suites,
+        fields.get('components', '').split()
+    )
@@ -22,7 +22,7 @@
 import logging
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk
+from gi.repository import Gtk, GLib
 import gettext
 
 FLATPAK_SUPPORT = False
@@ -33,12 +33,16 @@ except ImportError:
     FLATPAK_SUPPORT = False
     pass
 
+from .jobs import scheduler, PRIORITY_HIGH
 from .repo import Repo
 
 gettext.bindtextdomain('repoman', '/usr/share/repoman/po')
 gettext.textdomain("repoman")
 _ = gettext.gettext
 
+# Milliseconds to wait after the last keystroke before checking a source line
+CHECK_DELAY = 300
+
 class ErrorDialog(Gtk.Dialog):
 
     def __init__(self, parent, dialog_title, dialog_icon,
@@ -211,8 +215,6 @@ class AddDialog(Gtk.Dialog):
 
         content_area = self.get_content_area()
 
-        content_area = self.get_content_area()
-
         content_grid = Gtk.Grid()
         content_grid.set_margin_top(24)
         content_grid.set_margin_left(36)
@@ -234,9 +236,27 @@ class AddDialog(Gtk.Dialog):
         self.ppa_entry.connect(_("changed"), self.on_bottom_entry_changed)
         content_grid.attach(self.ppa_entry, 0, 2, 2, 1)
 
+        # What the line will be saved as, filled in by check_line()
+        self.check_timeout = None
+        self.check_job = None
+        self.check_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        self.check_label = Gtk.Label()
+        self.check_label.set_line_wrap(True)
+        self.check_label.set_max_width_chars(50)
+        self.check_label.set_xalign(0)
+        self.check_box.add(self.check_label)
+        self.preview_label = Gtk.Label()
+        self.preview_label.set_selectable(True)
+        self.preview_label.set_xalign(0)
+        Gtk.StyleContext.add_class(self.preview_label.get_style_context(),
+                                   "monospace")
+        self.check_box.add(self.preview_label)
+        self.check_box.set_no_show_all(True)
+        content_grid.attach(self.check_box, 0, 3, 2, 1)
+
         full_label = Gtk.Label(_('Or, enter repository details below:'))
         full_label.set_margin_top(36)
-        content_grid.attach(full_label, 0, 3, 2, 1)
+        content_grid.attach(full_label, 0, 4, 2, 1)
 
         name_label = Gtk.Label(_("Name:"))
         name_label.set_halign(Gtk.Align.END)
@@ -246,41 +266,41 @@ class AddDialog(Gtk.Dialog):
         version_label.set_halign(Gtk.Align.END)
         component_label = Gtk.Label(_("Component:"))
         component_label.set_halign(Gtk.Align.END)
-        content_grid.attach(name_label, 0, 4, 1, 1)
-        content_grid.attach(uri_label, 0, 5, 1, 1)
-        content_grid.attach(version_label, 0, 6, 1, 1)
-        content_grid.attach(component_label, 0, 7, 1, 1)
+        content_grid.attach(name_label, 0, 5, 1, 1)
+        content_grid.attach(uri_label, 0, 6, 1, 1)
+        content_grid.attach(version_label, 0, 7, 1, 1)
+        content_grid.attach(component_label, 0, 8, 1, 1)
 
         self.name_entry = Gtk.Entry()
         self.name_entry.set_placeholder_text('PPA...')
         self.name_entry.set_activates_default(False)
         self.name_entry.set_width_chars(40)
         self.name_entry.connect(_("changed"), self.on_top_entry_changed)
-        content_grid.attach(self.name_entry, 1, 4, 1, 1)
+        content_grid.attach(self.name_entry, 1, 5, 1, 1)
 
         self.source_check = Gtk.CheckButton(_('Include Source Code'))
         self.source_check.set_active(False)
         self.source_check.set_halign(Gtk.Align.CENTER)
-        content_grid.attach(self.source_check, 0, 8, 2, 1)
+        content_grid.attach(self.source_check, 0, 9, 2, 1)
 
         self.uri_entry = Gtk.Entry()
         self.uri_entry.set_placeholder_text("https://ppa.launchpad.net/...")
         self.uri_entry.set_activates_default(False)
         self.uri_entry.set_width_chars(40)
         self.uri_entry.connect(_("changed"), self.on_top_entry_changed)
-        content_grid.attach(self.uri_entry, 1, 5, 1, 1)
+        content_grid.attach(self.uri_entry, 1, 6, 1, 1)
 
         self.version_entry = Gtk.Entry()
         self.version_entry.set_placeholder_text(self.repo.get_codename())
         self.version_entry.set_activates_default(False)
         self.version_entry.connect(_("changed"), self.on_top_entry_changed)
-        content_grid.attach(self.version_entry, 1, 6, 1, 1)
+        content_grid.attach(self.version_entry, 1, 7, 1, 1)
 
         self.component_entry = Gtk.Entry()
         self.component_entry.set_placeholder_text("main")
         self.component_entry.set_activates_default(False)
         self.component_entry.connect(_("changed"), self.on_top_entry_changed)
-        content_grid.attach(self.component_entry, 1, 7, 1, 1)
+        content_grid.attach(self.component_entry, 1, 8, 1, 1)
 
         self.add_button = self.get_widget_for_response(Gtk.ResponseType.OK)
         self.add_button.set_sensitive(False)
@@ -289,7 +309,20 @@ class AddDialog(Gtk.Dialog):
                                    "suggested-action")
         self.add_button.grab_default()
 
-        self.show_all()
+        # The dialog is reused, so only its contents are shown here and the
+        # dialog itself is shown by run().
+        content_area.show_all()
+
+    def reset(self):
+        """
+        Clears the dialog so it can be used again.
+        """
+        for entry in (self.ppa_entry, self.name_entry, self.uri_entry,
+                      self.version_entry, self.component_entry):
+            entry.set_text('')
+        self.source_check.set_active(False)
+        self.add_button.set_sensitive(False)
+        self.ppa_entry.grab_focus()
 
     def on_top_entry_changed(self, widget):
         all_text = self.name_entry.get_text()
@@ -316,6 +349,7 @@ class AddDialog(Gtk.Dialog):
     
     def on_bottom_entry_changed(self, widget):
         ppa_line = widget.get_text()
+        self.check_line(ppa_line)
         if ppa_line == '' or ppa_line == None:
             self.name_entry.set_sensitive(True)
             self.uri_entry.set_sensitive(True)
@@ -332,15 +366,73 @@ class AddDialog(Gtk.Dialog):
             self.source_check.set_sensitive(False)
             self.ppa_entry.set_sensitive(True)
 
-            if ppa_line.startswith('deb'):
-                self.add_button.set_sensitive(True)
-            elif ppa_line.startswith('ppa:'):
-                if '/' in ppa_line:
-                    self.add_button.set_sensitive(True)
-                else: 
-                    self.add_button.set_sensitive(False)
-            else:
-                self.add_button.set_sensitive(False)
+            # Only enabled once check_line() has parsed the line
+            self.add_button.set_sensitive(False)
+
+    def check_line(self, ppa_line):
+        """
+        Parses PPA_LINE in the background once typing pauses, and shows what
+        it will be saved as.
+        """
+        if self.check_timeout:
+            GLib.source_remove(self.check_timeout)
+            self.check_timeout = None
+        if self.check_job:
+            self.check_job.cancel()
+            self.check_job = None
+        self.show_check(None)
+
+        if ppa_line.startswith('deb') or (ppa_line.startswith('ppa:') and '/' in ppa_line):
+            self.check_timeout = GLib.timeout_add(
+                CHECK_DELAY, self.on_check_timeout, ppa_line
+            )
+
+    def on_check_timeout(self, ppa_line):
+        self.check_timeout = None
+        self.check_job = scheduler.submit(
+            self.repo.check_source_line, ppa_line,
+            priority=PRIORITY_HIGH,
+            on_done=self.on_line_checked,
+            on_error=self.on_check_failed
+        )
+        return False
+
+    def on_line_checked(self, result):
+        self.check_job = None
+        if result['line'] != self.ppa_entry.get_text():
+            return
+        if result['error']:
+            self.show_check(_("This line can't be added: %s") % result['error'])
+        elif result['duplicates']:
+            names = ', '.join(result['duplicates'])
+            self.show_check(
+                _("This source has already been added as %s.") % names,
+                result['preview']
+            )
+        else:
+            self.show_check(
+                _("This will be saved as %s") % result['filename'],
+                result['preview']
+            )
+            self.add_button.set_sensitive(True)
+
+    def on_check_failed(self, error):
+        self.check_job = None
+        self.show_check(_("This line can't be added: %s") % error)
+
+    def show_check(self, message, preview=''):
+        """
+        Shows MESSAGE and PREVIEW under the line, or hides them if MESSAGE is
+        None.
+        """
+        if message is None:
+            self.check_box.hide()
+            return
+        self.check_label.set_text(message)
+        self.preview_label.set_text(preview.strip())
+        self.preview_label.set_visible(bool(preview))
+        self.check_box.show()
+        self.check_label.show()
 
 class FpAddDialog(Gtk.Dialog):
 
@@ -415,7 +507,7 @@ class EditDialog(Gtk.Dialog):
 
     def __init__(self,
                  parent,
-                 repo_filename):
+                 source=None):
 
         settings = Gtk.Settings.get_default()
         header = settings.props.gtk_dialogs_use_header
@@ -433,7 +525,7 @@ class EditDialog(Gtk.Dialog):
         self.log.setLevel(logging.WARNING)
 
         self.repo = Repo()
-        self.source = self.repo.get_source(repo_filename)
+        self.source = None
         self.parent = parent
 
         self.props.resizable = False
@@ -472,43 +564,33 @@ class EditDialog(Gtk.Dialog):
         enabled_grid.attach(enabled_label, 0, 0, 1, 1)
 
         self.enabled_switch = Gtk.Switch()
-        self.enabled_switch.set_active(self.source.enabled.get_bool())
         self.enabled_switch.set_halign(Gtk.Align.END)
         enabled_grid.attach(self.enabled_switch, 1, 0, 1, 1)
         content_grid.attach(enabled_grid, 0, 0, 2, 1)
 
         self.name_entry = Gtk.Entry()
         self.name_entry.set_placeholder_text("PPA...")
-        self.name_entry.set_text(self.source.name)
         self.name_entry.set_activates_default(False)
         self.name_entry.set_width_chars(40)
         content_grid.attach(self.name_entry, 1, 1, 1, 1)
 
         self.uri_entry = Gtk.Entry()
         self.uri_entry.set_placeholder_text("https://ppa.launchpad.net/...")
-        self.uri_entry.set_text(' '.join(self.source.uris))
         self.uri_entry.set_activates_default(False)
         content_grid.attach(self.uri_entry, 1, 2, 1, 1)
 
         self.version_entry = Gtk.Entry()
         self.version_entry.set_placeholder_text(self.repo.get_codename())
-        self.version_entry.set_text(' '.join(self.source.suites))
         self.version_entry.set_activates_default(False)
         content_grid.attach(self.version_entry, 1, 3, 1, 1)
 
         self.component_entry = Gtk.Entry()
         self.component_entry.set_placeholder_text("main")
-        self.component_entry.set_text(' '.join(self.source.components))
         self.component_entry.set_activates_default(False)
         content_grid.attach(self.component_entry, 1, 4, 1, 1)
 
         self.source_check = Gtk.CheckButton(_('Include Source Code'))
         self.source_check.set_halign(Gtk.Align.CENTER)
-        source_enabled = False
-        for type in self.source.types:
-            if type.value == "deb-src":
-                source_enabled = True
-        self.source_check.set_active(source_enabled)
         content_grid.attach(self.source_check, 0, 5, 2, 1)
 
 
@@ -536,7 +618,10 @@ class EditDialog(Gtk.Dialog):
         separator2.show()
         action_area.props.layout_style = Gtk.ButtonBoxStyle.START
 
-        self.show_all()
+        # The dialog is reused, so only its contents are shown here and the
+        # dialog itself is shown by run().
+        content_area.show_all()
+        action_area.show_all()
 
         if header == False:
             action_area.remove(save_button)
@@ -544,15 +629,35 @@ class EditDialog(Gtk.Dialog):
             action_area.add(cancel_button)
             action_area.add(save_button)
 
+        if source is not None:
+            self.set_source(source)
+
+    def set_source(self, source):
+        """
+        Fills the dialog in with SOURCE, a repolib.Source which has already
+        been loaded.
+        """
+        self.source = source
+        self.enabled_switch.set_active(source.enabled.get_bool())
+        self.name_entry.set_text(source.name)
+        self.uri_entry.set_text(' '.join(source.uris))
+        self.version_entry.set_text(' '.join(source.suites))
+        self.component_entry.set_text(' '.join(source.components))
+        source_enabled = False
+        for type in source.types:
+            if type.value == "deb-src":
+                source_enabled = True
+        self.source_check.set_active(source_enabled)
+
     def on_remove_button_clicked(self, widget):
         self.log.debug("Remove Clicked")
         dialog = DeleteDialog(self)
         response = dialog.run()
 
         if response == Gtk.ResponseType.OK:
-            self.repo.remove_source(self.source.filename)
+            # Whoever ran the dialog removes the source
             dialog.destroy()
-            self.destroy()
+            self.response(Gtk.ResponseType.REJECT)
         else:
             dialog.destroy()
 
@@ -0,0 +1,120 @@
+#!/usr/bin/python3
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+
+import itertools
+import logging
+import threading
+from collections import OrderedDict
+
+from gi.repository import GLib
+
+class Dispatcher:
+    """
+    Applies updates to the UI on the main thread, in batches of at most one
+    per frame.
+
+    post() can be called from any thread. Everything posted before the next
+    frame is run together from a tick callback on the attached widget, or
+    from an idle callback while there's no widget on screen to tick. An
+    update posted with a KEY replaces any update with the same KEY which
+    hasn't run yet, so a burst of identical refreshes only runs once.
+    """
+
+    def __init__(self):
+        self.widget = None
+        self.pending = OrderedDict()
+        self.counter = itertools.count()
+        self.scheduled = False
+        self.lock = threading.Lock()
+        self.max_depth = 0
+        self.posted = 0
+        self.merged = 0
+        self.batches = 0
+
+        self.log = logging.getLogger('repoman.Dispatcher')
+        handler = logging.StreamHandler()
+        formatter = logging.Formatter('%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
+        handler.setFormatter(formatter)
+        self.log.addHandler(handler)
+        self.log.setLevel(logging.WARNING)
+
+    def attach(self, widget):
+        """
+        Uses the frame clock of WIDGET to pace updates.
+        """
+        self.widget = widget
+
+    @property
+    def depth(self):
+        """
+        The number of updates waiting to run.
+        """
+        with self.lock:
+            return len(self.pending)
+
+    def post(self, func, *args, key=None):
+        """
+        Queues FUNC(*ARGS) to run on the main thread before the next frame.
+        """
+        with self.lock:
+            self.posted += 1
+            if key is None:
+                key = ('', next(self.counter))
+            elif self.pending.pop(key, None) is not None:
+                self.merged += 1
+            self.pending[key] = (func, args)
+            self.max_depth = max(self.max_depth, len(self.pending))
+            if self.scheduled:
+                return
+            self.scheduled = True
+        GLib.idle_add(self._schedule, priority=GLib.PRIORITY_HIGH_IDLE)
+
+    def _schedule(self):
+        widget = self.widget
+        if widget is not None and widget.get_mapped():
+            widget.add_tick_callback(self._on_tick)
+        else:
+            self.flush()
+        return False
+
+    def _on_tick(self, widget, frame_clock):
+        self.flush()
+        return GLib.SOURCE_REMOVE
+
+    def flush(self):
+        """
+        Runs every waiting update now.
+        """
+        with self.lock:
+            updates = list(self.pending.values())
+            self.pending.clear()
+            self.scheduled = False
+            self.batches += 1
+        self.log.debug('Running %d updates (%d merged so far, deepest queue %d)',
+                       len(updates), self.merged, self.max_depth)
+        for func, args in updates:
+            try:
+                func(*args)
+            except Exception:
+                self.log.exception('UI update %s failed', getattr(func, '__name__', func))
+
+dispatcher = Dispatcher()
@@ -24,6 +24,8 @@ import logging
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk
 from .dialog import FpAddDialog, FpDeleteDialog
+from .profiling import profiled
+from .timeline import timeline
 
 try:
     import pyflatpak as Flatpak
@@ -79,6 +81,7 @@ class FlatpakList(Gtk.Box):
         list_grid.attach(list_window, 0, 0, 1, 1)
 
         self.fp_liststore = Gtk.ListStore(str, str, str, str)
+        self.rows = {}
         self.view = Gtk.TreeView(self.fp_liststore)
         name_renderer = Gtk.CellRendererText()
         url_renderer = Gtk.CellRendererText()
@@ -120,22 +123,38 @@ class FlatpakList(Gtk.Box):
         action_bar.insert(add_button, 0)
         list_grid.attach(action_bar, 0, 1, 1, 1)
 
-        self.generate_entries(Flatpak.remotes.get_remotes())
+        with timeline.span('enumerate flatpak remotes'):
+            self.generate_entries(Flatpak.remotes.get_remotes())
     
     def generate_entries(self, fp_remotes_dict):
-        self.fp_liststore.clear()
+        """
+        Brings the listview in line with FP_REMOTES_DICT, only touching rows
+        which were added, removed, changed or moved.
+        """
+        for remote in list(self.rows):
+            if not remote in fp_remotes_dict:
+                self.fp_liststore.remove(self.rows.pop(remote))
 
         for remote in fp_remotes_dict:
-            #row = self.fp_liststore.insert(-1)
-            self.fp_liststore.append(
-                [
-                    fp_remotes_dict[remote]['name'],
-                    fp_remotes_dict[remote]['title'],
-                    fp_remotes_dict[remote]['url'],
-                    fp_remotes_dict[remote]['option']
-                ]
-            )
+            values = [
+                fp_remotes_dict[remote]['name'],
+                fp_remotes_dict[remote]['title'],
+                fp_remotes_dict[remote]['url'],
+                fp_remotes_dict[remote]['option']
+            ]
+            row = self.rows.get(remote)
+            if row is None:
+                self.rows[remote] = self.fp_liststore.append(values)
+            elif list(self.fp_liststore[row]) != values:
+                self.fp_liststore.set(row, [0, 1, 2, 3], values)
+
+        # Keep the same order as Flatpak
+        current_order = [self.fp_liststore.get_path(self.rows[remote])[0]
+                         for remote in fp_remotes_dict]
+        if current_order != sorted(current_order):
+            self.fp_liststore.reorder(current_order)
     
+    @profiled
     def on_row_activated(self, widget, data1, data2):
         tree_iter = self.fp_liststore.get_iter(data1)
         value = self.fp_liststore.get_value(tree_iter, 0)
@@ -149,6 +168,7 @@ class FlatpakList(Gtk.Box):
             value = model.get_value(tree_iter,1)
             self.ppa_name = value
 
+    @profiled
     def on_add_button_clicked(self, widget):
         #self.ppa.remove(self.ppa_name)
         dialog = FpAddDialog(self.parent.parent)
@@ -163,6 +183,7 @@ class FlatpakList(Gtk.Box):
             dialog.destroy()
         self.generate_entries(Flatpak.remotes.get_remotes())
     
+    @profiled
     def on_delete_button_clicked(self, widget):
         selec = self.view.get_selection()
         (model, pathlist) = selec.get_selected_rows()
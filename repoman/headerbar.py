@@ -23,6 +23,13 @@ import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk
 
+from .jobs import scheduler
+
+import gettext
+gettext.bindtextdomain('repoman', '/usr/share/repoman/po')
+gettext.textdomain("repoman")
+_ = gettext.gettext
+
 class Headerbar(Gtk.HeaderBar):
 
     ppa_name = False
@@ -42,4 +49,30 @@ class Headerbar(Gtk.HeaderBar):
         # spinner
         self.spinner = Gtk.Spinner()
         self.pack_end(self.spinner)
+        self.activity_label = Gtk.Label()
+        Gtk.StyleContext.add_class(self.activity_label.get_style_context(),
+                                   "dim-label")
+        self.activity_label.set_no_show_all(True)
+        self.pack_end(self.activity_label)
+        scheduler.connect('changed', self.on_jobs_changed)
+
+    def on_jobs_changed(self, scheduler, running, queued):
+        """
+        Shows the spinner while background jobs are running or waiting.
+        """
+        if running + queued == 0:
+            self.spinner.stop()
+            self.spinner.set_tooltip_text(None)
+            self.activity_label.hide()
+            return
+
+        status = _("%d running, %d queued") % (running, queued)
+        self.spinner.start()
+        self.spinner.set_tooltip_text(status)
+        if running + queued > 1:
+            self.activity_label.set_text(str(running + queued))
+            self.activity_label.set_tooltip_text(status)
+            self.activity_label.show()
+        else:
+            self.activity_label.hide()
 
@@ -0,0 +1,273 @@
+#!/usr/bin/python3
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+import concurrent.futures
+import glob
+import hashlib
+import json
+import logging
+import os
+import threading
+
+# Bump this whenever the layout of the cache file or of the parsed results
+# changes, so old caches are thrown away instead of misread.
+CACHE_VERSION = 2
+
+# Below this many changed files, thread start-up costs more than it saves.
+PARALLEL_THRESHOLD = 64
+
+# Parsing is pure Python, so the pool only pays off when reads are slow (a cold
+# page cache or network-mounted /etc). Loading is serial unless asked for.
+try:
+    DEFAULT_WORKERS = int(os.environ.get('REPOMAN_LOAD_WORKERS', 1))
+except ValueError:
+    DEFAULT_WORKERS = 1
+
+class SourceIndex:
+    """
+    Remembers the parsed contents of each .sources file in a directory.
+
+    Every file is keyed on its (mtime, size, inode), so a refresh only calls
+    PARSE(path, text) for files which were added or changed, and drops files
+    which were removed. A file whose stat changed but whose content hash
+    didn't (e.g. it was touched) isn't parsed again either. If the directory
+    mtime hasn't moved, nothing was added or removed and the glob is skipped;
+    the known files are still stat()ed because saving over an existing file
+    doesn't touch the directory.
+
+    When many files need parsing, they are read on a pool of up to WORKERS
+    threads. Set WORKERS to 1 to always parse serially.
+
+    The index can be saved to and seeded from a cache file, so a new process
+    can show the last known results before it has looked at the disk. DUMP
+    and LOAD convert results to and from something JSON can store.
+    """
+
+    def __init__(self, parse, sources_dir, pattern='*.sources',
+                 workers=DEFAULT_WORKERS, dump=None, load=None):
+        self.parse = parse
+        self.dump = dump or (lambda result: result)
+        self.load = load or (lambda data: data)
+        self.sources_dir = sources_dir
+        self.pattern = pattern
+        self.workers = workers
+        self.entries = {}
+        self.dir_mtime = None
+        self.dirty = False
+        self.lock = threading.Lock()
+
+        self.log = logging.getLogger('repoman.SourceIndex')
+        handler = logging.StreamHandler()
+        formatter = logging.Formatter('%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
+        handler.setFormatter(formatter)
+        self.log.addHandler(handler)
+        self.log.setLevel(logging.WARNING)
+
+    def refresh(self, workers=None):
+        """
+        Brings the index up to date with the disk and returns the results.
+
+        WORKERS overrides the pool size for this refresh only.
+        """
+        if workers is None:
+            workers = self.workers
+        with self.lock:
+            try:
+                dir_mtime = os.stat(self.sources_dir).st_mtime_ns
+            except FileNotFoundError:
+                self.dirty = self.dirty or bool(self.entries)
+                self.entries = {}
+                self.dir_mtime = None
+                return {}
+
+            if dir_mtime != self.dir_mtime:
+                self.log.debug('%s changed, rescanning', self.sources_dir)
+                paths = glob.glob(os.path.join(self.sources_dir, self.pattern))
+            else:
+                paths = list(self.entries)
+            # Store the mtime we saw before globbing, so anything added while
+            # we're scanning is picked up next time.
+            self.dir_mtime = dir_mtime
+
+            entries = {}
+            stale = []
+            for path in sorted(paths):
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                key = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+                old_entry = self.entries.get(path)
+                if old_entry and old_entry[0] == key:
+                    entries[path] = old_entry
+                else:
+                    entries[path] = None
+                    stale.append((path, key))
+
+            for (path, key), entry in zip(stale, self._load_all(stale, workers)):
+                if entry is None:
+                    # Removed while we were looking at it, or unreadable
+                    del entries[path]
+                else:
+                    entries[path] = entry
+            if stale or entries.keys() != self.entries.keys():
+                self.dirty = True
+            self.entries = entries
+            return self.get_results()
+
+    def _load(self, path, key):
+        """
+        Returns the (key, digest, result) entry for the file at PATH, or None
+        if it can't be read.
+        """
+        try:
+            with open(path, 'rb') as source_file:
+                data = source_file.read()
+        except FileNotFoundError:
+            return None
+        except OSError as err:
+            # Leave it out, rather than failing the whole refresh
+            self.log.warning('Could not read %s: %s', path, err)
+            return None
+        digest = hashlib.sha1(data).hexdigest()
+        old_entry = self.entries.get(path)
+        if old_entry and old_entry[1] == digest:
+            return (key, digest, old_entry[2])
+        self.log.debug('Parsing %s', path)
+        return (key, digest, self.parse(path, data.decode('utf-8', 'replace')))
+
+    def _load_all(self, stale, workers):
+        """
+        Yields the entry for each (path, key) in STALE, in order.
+        """
+        if workers <= 1 or len(stale) < PARALLEL_THRESHOLD:
+            for path, key in stale:
+                yield self._load(path, key)
+            return
+
+        self.log.debug('Parsing %d files on %d workers', len(stale), workers)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+            # map() hands the results back in the order they were submitted
+            yield from pool.map(lambda item: self._load(*item), stale)
+
+    def get_results(self):
+        """
+        Returns a dict of path -> parsed result from the last refresh.
+        """
+        return {path: entry[2] for path, entry in self.entries.items()}
+
+    def get(self, path):
+        """
+        Returns the parsed result for PATH from the last refresh, if any.
+        """
+        entry = self.entries.get(path)
+        return entry[2] if entry else None
+
+    def invalidate(self):
+        """
+        Forgets everything, so the next refresh parses every file again.
+        """
+        with self.lock:
+            self.entries = {}
+            self.dir_mtime = None
+            self.dirty = True
+
+    def load_cache(self, cache_file, tag):
+        """
+        Seeds an empty index from CACHE_FILE.
+
+        TAG identifies whatever produced the parsed results (e.g. the parser
+        library version); a cache written with another TAG or CACHE_VERSION is
+        ignored. Returns True if the cache was used.
+
+        This is called from the main thread, so it never waits for a refresh
+        which is under way; the cache isn't used, and the refresh's results
+        will be along shortly.
+        """
+        if self.lock.locked():
+            self.log.debug('Not using source cache: a refresh is running')
+            return False
+        try:
+            with open(cache_file) as cache:
+                data = json.load(cache)
+        except (OSError, ValueError) as err:
+            self.log.debug('Not using source cache: %s', err)
+            return False
+
+        if (not isinstance(data, dict)
+                or data.get('version') != CACHE_VERSION
+                or data.get('tag') != tag
+                or data.get('dir') != self.sources_dir):
+            self.log.debug('Source cache %s is out of date', cache_file)
+            return False
+
+        try:
+            entries = {
+                path: (tuple(entry['key']), entry['hash'], self.load(entry['result']))
+                for path, entry in data['entries'].items()
+            }
+        except (KeyError, TypeError, AttributeError, ValueError):
+            self.log.warning('Ignoring malformed source cache %s', cache_file)
+            return False
+
+        if not self.lock.acquire(blocking=False):
+            return False
+        try:
+            if self.entries:
+                return False
+            self.entries = entries
+            # The directory may have changed since; make the next refresh glob.
+            self.dir_mtime = None
+            self.dirty = False
+        finally:
+            self.lock.release()
+        return True
+
+    def save_cache(self, cache_file, tag):
+        """
+        Writes the index to CACHE_FILE if it changed since the last save.
+        """
+        with self.lock:
+            if not self.dirty:
+                return
+            data = {
+                'version': CACHE_VERSION,
+                'tag': tag,
+                'dir': self.sources_dir,
+                'entries': {
+                    path: {
+                        'key': entry[0],
+                        'hash': entry[1],
+                        'result': self.dump(entry[2])
+                    }
+                    for path, entry in self.entries.items()
+                },
+            }
+            self.dirty = False
+
+        try:
+            os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+            temp_file = '{}.{}.tmp'.format(cache_file, os.getpid())
+            with open(temp_file, 'w') as cache:
+                json.dump(data, cache, separators=(',', ':'))
+            os.replace(temp_file, cache_file)
+        except OSError as err:
+            self.log.warning('Could not save source cache %s: %s', cache_file, err)
@@ -0,0 +1,210 @@
+#!/usr/bin/python3
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+import itertools
+import logging
+import os
+import queue
+import threading
+
+from gi.repository import GObject
+
+from .dispatch import dispatcher
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 50
+PRIORITY_LOW = 100
+
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+
+class JobCancelled(Exception):
+    pass
+
+class CancelToken:
+    """
+    Lets a job know it should stop. Long-running jobs should call check()
+    between steps.
+    """
+
+    def __init__(self):
+        self.event = threading.Event()
+
+    def cancel(self):
+        self.event.set()
+
+    @property
+    def cancelled(self):
+        return self.event.is_set()
+
+    def check(self):
+        if self.event.is_set():
+            raise JobCancelled()
+
+class Job:
+    """
+    A piece of work for the Scheduler.
+
+    FUNC is called on a worker thread as FUNC(job, *ARGS). Its return value
+    is passed to ON_DONE, or the exception it raised to ON_ERROR. Progress
+    reported with report_progress() goes to ON_PROGRESS(fraction, message).
+    All of the callbacks run on the main thread, through the dispatcher.
+
+    If several jobs with the same KEY finish before the next frame, only the
+    callbacks of the last one to finish are run, so a KEY should only be
+    given to jobs whose callbacks do nothing but refresh what's shown.
+    """
+
+    def __init__(self, func, args, priority=PRIORITY_NORMAL, on_done=None,
+                 on_error=None, on_progress=None, token=None, key=None):
+        self.func = func
+        self.key = key
+        self.args = args
+        self.priority = priority
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_progress = on_progress
+        self.token = token or CancelToken()
+        self.progress = None
+        self.lock = threading.Lock()
+
+    def cancel(self):
+        self.token.cancel()
+
+    @property
+    def cancelled(self):
+        return self.token.cancelled
+
+    def report_progress(self, fraction, message=''):
+        """
+        Records progress from the worker thread.
+
+        Only the latest report is delivered; if the last one hasn't been
+        shown yet, this just replaces it.
+        """
+        if not self.on_progress:
+            return
+        with self.lock:
+            self.progress = (fraction, message)
+        dispatcher.post(self._deliver_progress, key=(self, 'progress'))
+
+    def _deliver_progress(self):
+        with self.lock:
+            progress = self.progress
+        if not self.cancelled:
+            self.on_progress(*progress)
+
+class Scheduler(GObject.GObject):
+    """
+    Runs Jobs on a bounded pool of worker threads, highest priority first.
+
+    The "changed" signal is emitted on the main thread with the number of
+    running and queued jobs whenever either changes.
+    """
+
+    __gsignals__ = {
+        'changed': (GObject.SignalFlags.RUN_FIRST, None, (int, int)),
+    }
+
+    def __init__(self, workers=DEFAULT_WORKERS):
+        GObject.GObject.__init__(self)
+        self.max_workers = workers
+        self.workers = []
+        self.queue = queue.PriorityQueue()
+        self.counter = itertools.count()
+        self.lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+
+        self.log = logging.getLogger('repoman.Scheduler')
+        handler = logging.StreamHandler()
+        formatter = logging.Formatter('%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
+        handler.setFormatter(formatter)
+        self.log.addHandler(handler)
+        self.log.setLevel(logging.WARNING)
+
+    def submit(self, func, *args, priority=PRIORITY_NORMAL, on_done=None,
+               on_error=None, on_progress=None, token=None, key=None):
+        """
+        Queues FUNC(job, *ARGS) to run and returns its Job.
+        """
+        job = Job(
+            func, args,
+            priority=priority,
+            on_done=on_done,
+            on_error=on_error,
+            on_progress=on_progress,
+            token=token,
+            key=key
+        )
+        with self.lock:
+            self.queued += 1
+            if len(self.workers) < self.max_workers and self.queued > self._idle_workers():
+                worker = threading.Thread(target=self._work, daemon=True)
+                self.workers.append(worker)
+                worker.start()
+        self.queue.put((priority, next(self.counter), job))
+        self._notify()
+        return job
+
+    def _idle_workers(self):
+        return len(self.workers) - self.running
+
+    def _work(self):
+        while True:
+            priority, count, job = self.queue.get()
+            with self.lock:
+                self.queued -= 1
+                self.running += 1
+            self._notify()
+
+            result = None
+            error = None
+            try:
+                job.token.check()
+                result = job.func(job, *job.args)
+            except Exception as err:
+                error = err
+
+            with self.lock:
+                self.running -= 1
+            self._notify()
+            key = None if job.key is None else (self, job.key)
+            dispatcher.post(self._finish, job, result, error, key=key)
+
+    def _finish(self, job, result, error):
+        if job.cancelled or isinstance(error, JobCancelled):
+            self.log.debug('Job %s was cancelled', job.func.__name__)
+        elif error is not None:
+            self.log.warning('Job %s failed: %s', job.func.__name__, error)
+            if job.on_error:
+                job.on_error(error)
+        elif job.on_done:
+            job.on_done(result)
+
+    def _notify(self):
+        dispatcher.post(self._emit_changed, key=(self, 'changed'))
+
+    def _emit_changed(self):
+        with self.lock:
+            running, queued = self.running, self.queued
+        self.emit('changed', running, queued)
+
+scheduler = Scheduler()
@@ -21,17 +21,31 @@
 
 import gi
 import logging
+import os
+import time
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk
+from gi.repository import Gtk, GLib
 
 from .dialog import AddDialog, EditDialog
+from .jobs import scheduler, PRIORITY_HIGH
+from .profiling import profiled
 from .repo import Repo
+from .search import SearchIndex
+from .timeline import timeline
+from .tracing import tracer
 
 import gettext
 gettext.bindtextdomain('repoman', '/usr/share/repoman/po')
 gettext.textdomain("repoman")
 _ = gettext.gettext
 
+# Placeholder rows shown until the sources have been loaded
+SKELETON_ROWS = 3
+
+# Row states while a bulk action is being applied
+STATUS_BUSY = 'busy'
+STATUS_FAILED = 'failed'
+
 class List(Gtk.Box):
 
     listiter_count = 0
@@ -75,18 +89,50 @@ class List(Gtk.Box):
 
         list_grid = Gtk.Grid()
         self.content_grid.attach(list_grid, 0, 2, 1, 1)
+
+        self.search_entry = Gtk.SearchEntry()
+        self.search_entry.set_placeholder_text(_("Search sources"))
+        self.search_entry.set_hexpand(True)
+        self.search_entry.connect('search-changed', self.on_search_changed)
+        list_grid.attach(self.search_entry, 0, 0, 1, 1)
+
         list_window = Gtk.ScrolledWindow()
-        list_grid.attach(list_window, 0, 0, 1, 1)
+        list_grid.attach(list_window, 0, 1, 1, 1)
+
+        # Rows only hold the filename; everything else is looked up in
+        # self.summaries when the row is drawn or sorted.
+        self.repo_liststore = Gtk.ListStore(str)
+        self.rows = {}
+        self.summaries = {}
+        self.row_status = {}
 
-        self.repo_liststore = Gtk.ListStore(str, str)
-        self.view = Gtk.TreeView(self.repo_liststore)
+        # The dialogs are built the first time they're needed and then kept.
+        # The selected source is loaded in the background so it's ready to
+        # edit; self.prefetched is its (filename, summary, source), which is
+        # only used while the summary is still the current one.
+        self.add_dialog = None
+        self.edit_dialog = None
+        self.prefetched = None
+        self.prefetch_job = None
+        self.prefetch_repo = None
+        self.edit_pending = None
+        self.search_index = SearchIndex()
+        self.visible_repos = None
+        self.filtered_store = self.repo_liststore.filter_new()
+        self.filtered_store.set_visible_func(self.is_row_visible)
+        self.sorted_store = Gtk.TreeModelSort(model=self.filtered_store)
+        self.sorted_store.set_sort_func(0, self.compare_rows)
+        self.sorted_store.set_sort_column_id(0, Gtk.SortType.ASCENDING)
+        self.view = Gtk.TreeView(self.sorted_store)
         renderer = Gtk.CellRendererText()
-        column = Gtk.TreeViewColumn(_("Source"), renderer, markup=0)
+        column = Gtk.TreeViewColumn(_("Source"), renderer)
+        column.set_cell_data_func(renderer, self.render_source)
         self.view.append_column(column)
         self.view.set_hexpand(True)
         self.view.set_vexpand(True)
         self.view.connect("row-activated", self.on_row_activated)
         tree_selection = self.view.get_selection()
+        tree_selection.set_mode(Gtk.SelectionMode.MULTIPLE)
         tree_selection.connect('changed', self.on_row_change)
         list_window.add(self.view)
 
@@ -100,6 +146,7 @@ class List(Gtk.Box):
 
         # edit button
         edit_button = Gtk.ToolButton()
+        self.edit_button = edit_button
         edit_button.set_icon_name("edit-symbolic")
         Gtk.StyleContext.add_class(edit_button.get_style_context(),
                                    "image-button")
@@ -112,10 +159,50 @@ class List(Gtk.Box):
                                    "inline-toolbar")
         action_bar.insert(edit_button, 0)
         action_bar.insert(add_button, 0)
-        list_grid.attach(action_bar, 0, 1, 1, 1)
 
-        self.generate_entries(self.repo.get_sources())
+        # actions on every selected source
+        self.actions_button = Gtk.MenuButton()
+        self.actions_button.set_image(Gtk.Image.new_from_icon_name(
+            "view-more-symbolic", Gtk.IconSize.SMALL_TOOLBAR
+        ))
+        self.actions_button.set_relief(Gtk.ReliefStyle.NONE)
+        self.actions_button.set_tooltip_text(_("Change Selected Sources"))
+        actions_menu = Gtk.Menu()
+        for label, action in ((_("Enable"), 'enable'),
+                              (_("Disable"), 'disable'),
+                              (_("Toggle Source Code"), 'toggle-source'),
+                              (_("Remove"), 'remove')):
+            item = Gtk.MenuItem.new_with_label(label)
+            item.connect('activate', self.on_bulk_action, action)
+            actions_menu.append(item)
+        actions_menu.show_all()
+        self.actions_button.set_popup(actions_menu)
+        actions_item = Gtk.ToolItem()
+        actions_item.add(self.actions_button)
+        action_bar.insert(actions_item, -1)
+        self.edit_button.set_sensitive(False)
+        self.actions_button.set_sensitive(False)
+        list_grid.attach(action_bar, 0, 2, 1, 1)
+
+        # Show what we saw last time straight away, then check the disk.
+        self.skeleton_rows = []
+        with timeline.span('load cached sources'):
+            cached_sources = self.repo.get_cached_sources()
+        if cached_sources:
+            self.generate_entries(cached_sources)
+        else:
+            self.view.set_sensitive(False)
+            for i in range(SKELETON_ROWS):
+                self.skeleton_rows.append(self.repo_liststore.append(['']))
+        self.refresh_sources()
+
+    def reconcile_sources(self, job):
+        """
+        Job which reloads the sources from the disk.
+        """
+        return self.repo.get_sources()
 
+    @profiled
     def on_edit_button_clicked(self, widget):
         """
         Edit Button Handler.
@@ -123,19 +210,40 @@ class List(Gtk.Box):
         tree_selection = self.view.get_selection()
         (model, pathlist) = tree_selection.get_selected_rows()
         tree_iter = model.get_iter(pathlist[0])
-        value = model.get_value(tree_iter, 1)
+        value = model.get_value(tree_iter, 0)
         self.log.info('PPA to edit: %s', value)
         self.do_edit(value)
 
+    @profiled
     def on_row_activated(self, widget, data, data2):
-        tree_iter = self.repo_liststore.get_iter(data)
-        value = self.repo_liststore.get_value(tree_iter, 1)
+        model = widget.get_model()
+        tree_iter = model.get_iter(data)
+        value = model.get_value(tree_iter, 0)
         self.log.info("PPA to edit: %s" % value)
         self.do_edit(value)
 
     def do_edit(self, repo):
-        dialog = EditDialog(self.parent.parent, repo)
+        """
+        Opens the editor for REPO, once it has been loaded if the prefetch
+        hasn't finished yet.
+        """
+        source = self.get_prefetched_source(repo)
+        if source is None:
+            self.edit_pending = repo
+            self.prefetch_source(repo, priority=PRIORITY_HIGH)
+            return
+        self.show_edit_dialog(source)
+
+    @profiled
+    def show_edit_dialog(self, source):
+        if self.edit_dialog is None:
+            self.edit_dialog = EditDialog(self.parent.parent)
+        dialog = self.edit_dialog
+        dialog.set_source(source)
         response = dialog.run()
+        dialog.hide()
+        # The dialog may change the source, so load it again next time
+        self.prefetched = None
 
         if response == Gtk.ResponseType.OK:
             dialog.source.name = dialog.name_entry.get_text()
@@ -144,57 +252,345 @@ class List(Gtk.Box):
             dialog.source.components = dialog.component_entry.get_text().split()
             dialog.source.set_enabled(dialog.enabled_switch.get_active())
             dialog.source.set_source_enabled(dialog.source_check.get_active())
-            self.repo.set_modified_source(dialog.source)
-            dialog.destroy()
-        else:
-            dialog.destroy()
-        self.generate_entries(self.repo.get_sources())
+            self.change_source(self.repo.set_modified_source, dialog.source)
+        elif response == Gtk.ResponseType.REJECT:
+            self.change_source(self.repo.remove_source, dialog.source.filename)
+
+    def change_source(self, call, *args):
+        """
+        Makes the privileged CALL(*ARGS) without waiting for it, then reloads
+        the list once it's done or shows what went wrong.
+        """
+        trace_id = tracer.new_trace_id()
+
+        def on_reply(*result):
+            self.refresh_sources(trace_id=trace_id)
+
+        def on_error(error):
+            self.parent.parent.throw_error_dialog(
+                error.get_dbus_message() or str(error), "error"
+            )
+            self.refresh_sources()
 
+        call(*args, reply_handler=on_reply, error_handler=on_error,
+             trace_id=trace_id)
+
+    @profiled
     def on_add_button_clicked(self, widget):
-        dialog = AddDialog(self.parent.parent)
+        if self.add_dialog is None:
+            self.add_dialog = AddDialog(self.parent.parent)
+        dialog = self.add_dialog
+        dialog.reset()
         response = dialog.run()
+        dialog.hide()
 
         if response == Gtk.ResponseType.OK:
             self.repo.add_source(dialog)
-            dialog.destroy()
-            self.generate_entries(self.repo.get_sources())
+
+    def refresh_sources(self, trace_id=None):
+        """
+        Reloads the list in the background. If several reloads finish at
+        once, only the newest one updates the list.
+
+        TRACE_ID is the operation the reload follows, if it's being traced.
+        """
+        if trace_id is None:
+            on_done = self.generate_entries
         else:
-            dialog.destroy()
-        self.generate_entries(self.repo.get_sources())
+            started = time.time()
+
+            def on_done(entries):
+                with tracer.span(trace_id, 'ui refresh'):
+                    self.generate_entries(entries)
+                tracer.record(trace_id, 'reload', started, time.time())
+
+        scheduler.submit(
+            self.reconcile_sources,
+            on_done=on_done,
+            on_error=self.on_reload_failed,
+            key=self.reconcile_sources
+        )
+
+    def on_reload_failed(self, error):
+        self.clear_skeleton_rows()
+        self.parent.parent.throw_error_dialog(
+            _("Could not load the extra sources: %s") % error, "error"
+        )
+
+    def prefetch_source(self, repo, priority=None):
+        """
+        Starts loading REPO in the background, unless it's already loaded or
+        on its way.
+        """
+        if self.get_prefetched_source(repo) is not None:
+            return
+        if self.prefetch_job is not None:
+            # A queued job can't be moved up, so it's replaced instead
+            if self.prefetch_repo == repo and priority is None:
+                return
+            self.prefetch_job.cancel()
+        kwargs = {}
+        if priority is not None:
+            kwargs['priority'] = priority
+        self.prefetch_repo = repo
+        self.prefetch_job = scheduler.submit(
+            self.load_source, repo, self.summaries.get(repo),
+            on_done=self.on_source_prefetched,
+            on_error=self.on_prefetch_failed,
+            **kwargs
+        )
+
+    def load_source(self, job, repo, summary):
+        """
+        Job which loads the full source for REPO.
+        """
+        return (repo, summary, self.repo.get_source(repo))
+
+    def get_prefetched_source(self, repo):
+        if not self.prefetched:
+            return None
+        prefetched_repo, summary, source = self.prefetched
+        if prefetched_repo != repo or summary is not self.summaries.get(repo):
+            return None
+        return source
+
+    def on_source_prefetched(self, result):
+        self.prefetch_job = None
+        self.prefetch_repo = None
+        self.prefetched = result
+        if self.edit_pending == result[0]:
+            self.edit_pending = None
+            # The editor runs its own main loop, so open it outside of the
+            # batch of updates this was delivered in.
+            GLib.idle_add(self.show_edit_dialog, result[2])
+
+    def on_prefetch_failed(self, error):
+        self.prefetch_job = None
+        self.prefetch_repo = None
+        if self.edit_pending:
+            self.edit_pending = None
+            self.parent.parent.throw_error_dialog(
+                _("Could not load the source: %s") % error, "error"
+            )
     
+    def clear_skeleton_rows(self):
+        """
+        Takes away the placeholder rows shown while the list first loads.
+        """
+        if self.skeleton_rows:
+            for row in self.skeleton_rows:
+                self.repo_liststore.remove(row)
+            self.skeleton_rows = []
+            self.view.set_sensitive(True)
+
     def generate_entries(self, sources):
         """
-        Add entries to the listview.
+        Brings the listview in line with SOURCES, a dict of filename ->
+        SourceSummary.
+
+        Only rows which were added, removed or changed are touched, so the
+        selection and scroll position survive a refresh.
         """
-        self.repo_liststore.clear()
-        
-        for repo in sources:
-            if not 'Disabled' in sources[repo]:
-                self.repo_liststore.append(
-                    [
-                        sources[repo], repo
-                    ]
+        self.clear_skeleton_rows()
+
+        # Unchanged files keep the same summary object in the source index
+        changed = [
+            repo for repo in sources
+            if self.summaries.get(repo) is not sources[repo]
+        ]
+        for repo in self.rows:
+            if not repo in sources:
+                self.search_index.remove(repo)
+        for repo in changed:
+            self.index_source(sources[repo])
+        # Work out what matches before the rows change, so new rows are
+        # filtered as they go in.
+        self.visible_repos = self.search_index.search(
+            self.search_entry.get_text()
+        )
+        self.summaries = sources
+
+        for repo in list(self.rows):
+            if not repo in sources:
+                self.repo_liststore.remove(self.rows.pop(repo))
+                self.row_status.pop(repo, None)
+
+        for repo in changed:
+            row = self.rows.get(repo)
+            if row is None:
+                self.rows[repo] = self.repo_liststore.append([repo])
+            else:
+                self.repo_liststore.row_changed(
+                    self.repo_liststore.get_path(row), row
                 )
-        for repo in sources:
-            if 'Disabled' in sources[repo]:
-                self.repo_liststore.append(
-                    [
-                        sources[repo], repo
-                    ]
+
+    def index_source(self, summary):
+        """
+        Updates the search index for the source in SUMMARY.
+        """
+        self.search_index.update(summary.path, [
+            summary.name,
+            ' '.join(summary.uris),
+            ' '.join(summary.suites),
+            ' '.join(summary.components),
+            os.path.basename(summary.path)
+        ])
+
+    def render_source(self, column, cell, model, row, data=None):
+        repo = model.get_value(row, 0)
+        summary = self.summaries.get(repo)
+        if not repo:
+            cell.set_property('markup', '<span alpha="25%">{}</span>'.format(
+                _("Loading…")
+            ))
+        elif summary is None:
+            cell.set_property('markup', '')
+        else:
+            if summary.enabled:
+                markup = '<b>{}</b>'.format(
+                    GLib.markup_escape_text(summary.name)
                 )
+            else:
+                markup = '{} <i>{}</i>'.format(
+                    GLib.markup_escape_text(summary.name), _("Disabled")
+                )
+            status = self.row_status.get(repo)
+            if status and status[0] == STATUS_BUSY:
+                markup += ' <span alpha="50%">{}</span>'.format(_("Applying…"))
+            elif status and status[0] == STATUS_FAILED:
+                markup += '\n<small><i>{}</i></small>'.format(
+                    GLib.markup_escape_text(status[1])
+                )
+            cell.set_property('markup', markup)
+
+    @profiled
+    def on_search_changed(self, widget):
+        self.visible_repos = self.search_index.search(widget.get_text())
+        self.filtered_store.refilter()
+
+    def is_row_visible(self, model, row, data=None):
+        if self.visible_repos is None:
+            return True
+        return model.get_value(row, 0) in self.visible_repos
+
+    def compare_rows(self, model, row_a, row_b, data=None):
+        """
+        Sorts enabled sources before disabled ones, then by filename.
+        """
+        key_a = self.get_sort_key(model.get_value(row_a, 0))
+        key_b = self.get_sort_key(model.get_value(row_b, 0))
+        return (key_a > key_b) - (key_a < key_b)
+
+    def get_sort_key(self, repo):
+        summary = self.summaries.get(repo)
+        enabled = summary is not None and summary.enabled
+        return (not enabled, repo or '')
 
     def on_row_change(self, widget):
         (model, pathlist) = widget.get_selected_rows()
         for path in pathlist :
             tree_iter = model.get_iter(path)
-            value = model.get_value(tree_iter,1)
+            value = model.get_value(tree_iter,0)
             self.log.debug(value)
             self.repo_name = value
+        self.edit_button.set_sensitive(len(pathlist) == 1)
+        self.actions_button.set_sensitive(len(pathlist) > 0)
+        if len(pathlist) == 1 and self.repo_name in self.summaries:
+            self.prefetch_source(self.repo_name)
+
+    def get_selected_repos(self):
+        """
+        Returns the filenames of the selected sources.
+        """
+        (model, pathlist) = self.view.get_selection().get_selected_rows()
+        repos = []
+        for path in pathlist:
+            repo = model.get_value(model.get_iter(path), 0)
+            if repo and repo in self.summaries:
+                repos.append(repo)
+        return repos
+
+    @profiled
+    def on_bulk_action(self, widget, action):
+        """
+        Applies ACTION to every selected source in one privileged call.
+        """
+        repos = self.get_selected_repos()
+        if not repos:
+            return
+        if action == 'remove' and not self.confirm_remove(repos):
+            return
 
-    def throw_error_dialog(self, message, msg_type):
-        if msg_type == "error":
-            msg_type = Gtk.MessageType.ERROR
-        dialog = Gtk.MessageDialog(self.parent.parent, 0, msg_type,
-                                   Gtk.ButtonsType.CLOSE, message)
-        dialog.run()
+        operations = []
+        for repo in repos:
+            if action == 'enable':
+                operations.append(('set-enabled', repo, 'true'))
+            elif action == 'disable':
+                operations.append(('set-enabled', repo, 'false'))
+            elif action == 'toggle-source':
+                source_code = self.summaries[repo].source_code_enabled
+                operations.append(
+                    ('set-source', repo, 'false' if source_code else 'true')
+                )
+            elif action == 'remove':
+                operations.append(('remove', repo, ''))
+        self.log.debug('Bulk %s on %d sources', action, len(repos))
+        self.apply_operations(repos, operations)
+
+    def confirm_remove(self, repos):
+        if len(repos) == 1:
+            message = _("Remove %s?") % self.summaries[repos[0]].name
+        else:
+            message = gettext.ngettext(
+                "Remove %d source?", "Remove %d sources?", len(repos)
+            ) % len(repos)
+        dialog = Gtk.MessageDialog(self.parent.parent, 0,
+                                   Gtk.MessageType.QUESTION,
+                                   Gtk.ButtonsType.OK_CANCEL, message)
+        response = dialog.run()
         dialog.destroy()
+        return response == Gtk.ResponseType.OK
+
+    def apply_operations(self, repos, operations):
+        """
+        Sends OPERATIONS, one for each of REPOS, as a single transaction and
+        shows how each one went on its row.
+        """
+        for repo in repos:
+            self.set_row_status(repo, (STATUS_BUSY, ''))
+        trace_id = tracer.new_trace_id()
+
+        def on_reply(results):
+            for repo, (code, message) in zip(repos, results):
+                if code == 0:
+                    self.set_row_status(repo, None)
+                else:
+                    self.log.warning('%s: %s', repo, message)
+                    self.set_row_status(repo, (STATUS_FAILED, str(message)))
+            self.refresh_sources(trace_id=trace_id)
+
+        def on_error(error):
+            message = error.get_dbus_message() or str(error)
+            for repo in repos:
+                self.set_row_status(repo, (STATUS_FAILED, message))
+            self.parent.parent.throw_error_dialog(message, "error")
+
+        self.repo.apply_transaction(
+            operations, reply_handler=on_reply, error_handler=on_error,
+            trace_id=trace_id
+        )
+
+    def set_row_status(self, repo, status):
+        """
+        Sets the bulk action STATUS shown on REPO's row, or clears it if
+        STATUS is None.
+        """
+        if status is None:
+            self.row_status.pop(repo, None)
+        else:
+            self.row_status[repo] = status
+        row = self.rows.get(repo)
+        if row is not None:
+            self.repo_liststore.row_changed(
+                self.repo_liststore.get_path(row), row
+            )
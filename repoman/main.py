@@ -19,39 +19,198 @@
     along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
+
 import logging
-import gi
-gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, Gdk
-from .window import Window
+import sys
+
+from .timeline import timeline, TRACE_OPTION
+if TRACE_OPTION in sys.argv:
+    timeline.enable()
+
+with timeline.span('import gi'):
+    import gi
+    gi.require_version('Gtk', '3.0')
+    from gi.repository import Gtk, Gdk, Gio, GLib
+with timeline.span('import repoman'):
+    from .changes import change_set, APPLY_MODES
+    from .repo import warm_up_daemon
+    from .window import Window
+
+import gettext
+gettext.bindtextdomain('repoman', '/usr/share/repoman/po')
+gettext.textdomain("repoman")
+_ = gettext.gettext
+
+APPLICATION_ID = 'ro.santopiet.repoman'
 
 class Application(Gtk.Application):
+    """
+    Only one Repoman runs per session; launching it again just raises the
+    existing window.
 
-    def do_activate(self):
+    With --keep-alive, closing the window hides it and the application keeps
+    running, so the next launch shows the window straight away. Ctrl+Q
+    quits for real.
+    """
 
-        self.log = logging.getLogger("repoman.Updates")
+    def __init__(self):
+        Gtk.Application.__init__(
+            self,
+            application_id=APPLICATION_ID,
+            flags=Gio.ApplicationFlags.FLAGS_NONE
+        )
+        self.win = None
+        self.keep_alive = False
+
+        self.log = logging.getLogger("repoman.Application")
         handler = logging.StreamHandler()
         formatter = logging.Formatter('%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
         handler.setFormatter(formatter)
         self.log.addHandler(handler)
         self.log.setLevel(logging.WARNING)
 
-        self.win = Window()
-        self.win.set_default_size(700, 400)
-        self.win.connect("delete-event", Gtk.main_quit)
-        self.win.show_all()
-        self.win.stack.updates.noti_grid.hide()
-        self.win.stack.updates.notifications_title.hide()
-        self.win.stack.updates.notifications_label.hide()
+        self.add_main_option(
+            'keep-alive', 0, GLib.OptionFlags.NONE, GLib.OptionArg.NONE,
+            _("Keep running in the background when the window is closed"),
+            None
+        )
+        self.add_main_option(
+            'apply-mode', 0, GLib.OptionFlags.NONE, GLib.OptionArg.STRING,
+            _("When to write changes to the system sources: immediate, "
+              "delay (together, once they stop coming) or manual (from the "
+              "Apply bar)"),
+            'MODE'
+        )
+        # Handled before anything is imported; listed so it's accepted
+        self.add_main_option(
+            TRACE_OPTION[2:], 0, GLib.OptionFlags.NONE, GLib.OptionArg.NONE,
+            _("Write a timeline of startup to the cache directory"),
+            None
+        )
 
-        Gtk.main()
+    def do_handle_local_options(self, options):
+        if options.contains('keep-alive'):
+            self.keep_alive = True
+        if options.contains('apply-mode'):
+            mode = options.lookup_value('apply-mode', GLib.VariantType.new('s'))
+            try:
+                change_set.set_mode(mode.get_string())
+            except ValueError:
+                self.log.error(
+                    'Unknown apply mode %s; use one of %s',
+                    mode.get_string(), ', '.join(APPLY_MODES)
+                )
+                return 1
+        # Carry on with the default handling
+        return -1
 
-app = Application()
+    def do_startup(self):
+        with timeline.span('Application.do_startup'):
+            self._startup()
+
+    def _startup(self):
+        Gtk.Application.do_startup(self)
+
+        style_provider = Gtk.CssProvider()
+        Gtk.StyleContext.add_provider_for_screen(
+            Gdk.Screen.get_default(), style_provider,
+            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+        )
+
+        quit_action = Gio.SimpleAction.new('quit', None)
+        quit_action.connect('activate', self.on_quit)
+        self.add_action(quit_action)
+        self.set_accels_for_action('app.quit', ['<Primary>q'])
 
-style_provider = Gtk.CssProvider()
-Gtk.StyleContext.add_provider_for_screen(
-    Gdk.Screen.get_default(), style_provider,
-    Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-)
+        if self.keep_alive:
+            # Stay running while the window is hidden
+            self.hold()
 
-app.run()
+    def do_activate(self):
+        if self.win is None:
+            # Let the daemon start up while the window is being built
+            with timeline.span('warm up daemon'):
+                warm_up_daemon()
+            with timeline.span('Window()'):
+                self.win = Window()
+            self.win.set_default_size(700, 400)
+            self.win.connect("delete-event", self.on_delete_event)
+            self.add_window(self.win)
+            with timeline.span('Window.show_all'):
+                self.win.show_all()
+            if timeline.enabled:
+                self.first_draw_handler = self.win.connect_after(
+                    'draw', self.on_first_draw
+                )
+        else:
+            self.log.debug('Already running, raising the window')
+        self.win.present()
+
+    def on_first_draw(self, window, context):
+        timeline.mark('first frame drawn')
+        window.disconnect(self.first_draw_handler)
+        return False
+
+    def on_delete_event(self, window, event):
+        if change_set.staged:
+            self.settle_changes(self.close_window)
+            return True
+        if self.keep_alive:
+            window.hide()
+            return True
+        return False
+
+    def close_window(self):
+        if self.keep_alive:
+            self.win.hide()
+        else:
+            self.win.destroy()
+
+    def on_quit(self, action, parameter):
+        if change_set.staged:
+            self.settle_changes(self.quit_now)
+        else:
+            self.quit_now()
+
+    def quit_now(self):
+        if self.keep_alive:
+            self.keep_alive = False
+            self.release()
+        if self.win is not None:
+            self.win.destroy()
+        self.quit()
+
+    def settle_changes(self, then):
+        """
+        Asks whether to apply or discard the staged changes, then calls THEN()
+        once the daemon has answered for them. If the user cancels, or the
+        changes fail, the window stays open.
+        """
+        self.win.present()
+        pending = len(change_set.staged)
+        dialog = Gtk.MessageDialog(self.win, 0, Gtk.MessageType.QUESTION,
+                                   Gtk.ButtonsType.NONE,
+                                   _("Apply changes before closing?"))
+        dialog.format_secondary_text(gettext.ngettext(
+            "%d change has not been applied yet.",
+            "%d changes have not been applied yet.",
+            pending
+        ) % pending)
+        dialog.add_buttons(_("Discard"), Gtk.ResponseType.REJECT,
+                           Gtk.STOCK_CANCEL, Gtk.ResponseType.CANCEL,
+                           _("Apply"), Gtk.ResponseType.APPLY)
+        dialog.set_default_response(Gtk.ResponseType.APPLY)
+        response = dialog.run()
+        dialog.destroy()
+
+        if response == Gtk.ResponseType.APPLY:
+            change_set.apply()
+        elif response == Gtk.ResponseType.REJECT:
+            change_set.revert()
+        else:
+            return
+        change_set.wait(lambda succeeded: succeeded and then())
+
+timeline.mark('imports done')
+app = Application()
+app.run(sys.argv)
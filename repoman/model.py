@@ -0,0 +1,194 @@
+#!/usr/bin/python3
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+import logging
+import os
+
+import repolib
+
+from gi.repository import GObject, Gio
+
+from .jobs import scheduler, PRIORITY_HIGH
+from .timeline import timeline
+
+SYSTEM_SOURCE_FILE = '/etc/apt/sources.list.d/system.sources'
+OS_RELEASE_FILE = '/etc/os-release'
+DEFAULT_OS_NAME = "your OS"
+
+def read_os_name():
+    """
+    Returns the NAME from /etc/os-release.
+    """
+    try:
+        with open(OS_RELEASE_FILE) as os_release_file:
+            os_release = os_release_file.readlines()
+            for line in os_release:
+                parse = line.split('=')
+                if parse[0] == "NAME":
+                    if parse[1].startswith('"'):
+                        return parse[1][1:-2]
+                    else:
+                        return parse[1][:-1]
+                else:
+                    continue
+    except FileNotFoundError:
+        return DEFAULT_OS_NAME
+
+    return DEFAULT_OS_NAME
+
+def _get_file_key(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+class SystemModel(GObject.GObject):
+    """
+    The system source, codename and OS name, shared by the whole process.
+
+    Everything is loaded once, by a job, and loaded again only when
+    system.sources or os-release actually change. The "changed" signal is
+    emitted on the main thread each time new values arrive; use subscribe()
+    to also be called straight away if they're already loaded. "failed" is
+    emitted with a message if loading goes wrong.
+    """
+
+    __gsignals__ = {
+        'changed': (GObject.SignalFlags.RUN_FIRST, None, ()),
+        'failed': (GObject.SignalFlags.RUN_FIRST, None, (str,)),
+    }
+
+    def __init__(self):
+        GObject.GObject.__init__(self)
+        self.system_source = None
+        self.os_name = DEFAULT_OS_NAME
+        self.codename = repolib.util.DISTRO_CODENAME
+        self.suites = []
+        self.components = []
+        self.source_code = False
+        self.loaded = False
+        self.file_keys = None
+        self.loading = False
+        self.reload_pending = False
+        self.monitors = []
+
+        self.log = logging.getLogger('repoman.SystemModel')
+        handler = logging.StreamHandler()
+        formatter = logging.Formatter('%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
+        handler.setFormatter(formatter)
+        self.log.addHandler(handler)
+        self.log.setLevel(logging.WARNING)
+
+    def subscribe(self, callback):
+        """
+        Calls CALLBACK(model) now if the model is loaded, and again whenever
+        it changes. Returns the signal handler id.
+        """
+        handler_id = self.connect('changed', callback)
+        if self.loaded:
+            callback(self)
+        return handler_id
+
+    def start(self):
+        """
+        Starts loading the model and watching the files it comes from.
+        """
+        if not self.monitors:
+            for path in (SYSTEM_SOURCE_FILE, OS_RELEASE_FILE):
+                monitor = Gio.File.new_for_path(path).monitor_file(
+                    Gio.FileMonitorFlags.NONE, None
+                )
+                monitor.connect('changed', self.on_file_changed)
+                self.monitors.append(monitor)
+        self.refresh()
+
+    def on_file_changed(self, monitor, changed_file, other_file, event_type):
+        if event_type in (Gio.FileMonitorEvent.CHANGES_DONE_HINT,
+                          Gio.FileMonitorEvent.CREATED,
+                          Gio.FileMonitorEvent.DELETED):
+            self.refresh()
+
+    def refresh(self):
+        """
+        Reloads the model in the background if its files have changed.
+        """
+        if self.loading:
+            self.reload_pending = True
+            return
+        self.loading = True
+        scheduler.submit(
+            self._load,
+            priority=PRIORITY_HIGH,
+            on_done=self._on_loaded,
+            on_error=self._on_load_failed
+        )
+
+    def _load(self, job):
+        file_keys = (
+            _get_file_key(SYSTEM_SOURCE_FILE),
+            _get_file_key(OS_RELEASE_FILE)
+        )
+        if self.loaded and file_keys == self.file_keys:
+            self.log.debug('System source is unchanged')
+            return None
+
+        with timeline.span('load system source', 'job'):
+            system_source = repolib.SystemSource()
+            system_source.load_from_file()
+        source_code = False
+        for source_type in system_source.types:
+            if source_type.value == "deb-src":
+                source_code = True
+        return {
+            'file_keys': file_keys,
+            'system_source': system_source,
+            'os_name': read_os_name(),
+            'suites': list(system_source.suites),
+            'components': list(system_source.components),
+            'source_code': source_code,
+        }
+
+    def _on_loaded(self, result):
+        self._finish_loading()
+        if result is None:
+            return
+        self.file_keys = result['file_keys']
+        self.system_source = result['system_source']
+        self.os_name = result['os_name']
+        self.suites = result['suites']
+        self.components = result['components']
+        self.source_code = result['source_code']
+        self.loaded = True
+        self.emit('changed')
+
+    def _on_load_failed(self, error):
+        self._finish_loading()
+        self.log.warning('Could not load the system source: %s', error)
+        self.emit('failed', str(error))
+
+    def _finish_loading(self):
+        self.loading = False
+        if self.reload_pending:
+            self.reload_pending = False
+            self.refresh()
+
+system_model = SystemModel()
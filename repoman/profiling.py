@@ -0,0 +1,108 @@
+#!/usr/bin/python3
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+
+import cProfile
+import functools
+import itertools
+import logging
+import os
+import re
+import tracemalloc
+
+# Set to a directory to profile each user action into it
+PROFILE_ENV = 'REPOMAN_PROFILE_DIR'
+PROFILE_DIR = os.environ.get(PROFILE_ENV)
+
+# How many of the biggest allocation changes to list for each action
+TOP_ALLOCATIONS = 25
+
+log = logging.getLogger('repoman.profiling')
+handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
+handler.setFormatter(formatter)
+log.addHandler(handler)
+log.setLevel(logging.WARNING)
+
+_counter = itertools.count(1)
+_active = False
+
+def profiled(func):
+    """
+    Decorates a user action so each call is profiled when REPOMAN_PROFILE_DIR
+    is set.
+
+    Every call writes NNNN-<action>.prof, which pstats or snakeviz can read,
+    and NNNN-<action>.alloc.txt, the allocations which grew the most while
+    it ran. Actions started from inside another one (e.g. from a dialog's
+    main loop) are counted as part of it. When profiling is off, FUNC is
+    returned as it is.
+    """
+    if not PROFILE_DIR:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        global _active
+        if _active:
+            return func(*args, **kwargs)
+        _active = True
+        try:
+            return _run_profiled(func.__qualname__, func, args, kwargs)
+        finally:
+            _active = False
+    return wrapper
+
+def _run_profiled(action, func, args, kwargs):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        profile.disable()
+        after = tracemalloc.take_snapshot()
+        _write_results(action, profile, before, after)
+
+def _write_results(action, profile, before, after):
+    prefix = os.path.join(PROFILE_DIR, '{:04d}-{}'.format(
+        next(_counter), re.sub(r'[^\w.-]+', '_', action)
+    ))
+    ignore = (
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, __file__),
+    )
+    changes = after.filter_traces(ignore).compare_to(
+        before.filter_traces(ignore), 'lineno'
+    )
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        profile.dump_stats(prefix + '.prof')
+        with open(prefix + '.alloc.txt', 'w') as alloc_file:
+            alloc_file.write('{}\n'.format(action))
+            for change in changes[:TOP_ALLOCATIONS]:
+                alloc_file.write('{}\n'.format(change))
+    except OSError as err:
+        log.warning('Could not write profile for %s: %s', action, err)
+        return
+    log.info('Profiled %s into %s.*', action, prefix)
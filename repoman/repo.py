@@ -19,10 +19,10 @@
     along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
 '''
 
-import apt
 import dbus
-import glob
+import dbus.mainloop.glib
 import logging
+import os
 import sys
 import threading
 import time
@@ -32,49 +32,235 @@ import repolib
 
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import GObject, GLib
+from gi.repository import GLib
+
+from .deb822 import scan_source, SourceSummary
+from .dispatch import dispatcher
+from .index import SourceIndex
+from .jobs import scheduler
+from .model import system_model
+from .timeline import get_cache_file
+from .tracing import tracer
 
 # Set up threads
 GLib.threads_init()
 
 SOURCES_DIR = '/etc/apt/sources.list.d'
 
-bus = dbus.SystemBus()
-
-privileged_object = bus.get_object(
-    'ro.santopiet.repoman', '/PPAObject'
-)
-
 SYSTEM_SOURCES = [
     '/etc/apt/sources.list.d/system.sources'
 ]
 
-class AddThread(threading.Thread):
-    cache = apt.Cache()
+PRIVILEGED_NAME = 'ro.santopiet.repoman'
+PRIVILEGED_PATH = '/PPAObject'
+PRIVILEGED_INTERFACE = 'ro.santopiet.repoman.Interface'
 
-    def __init__(self, parent, source_line):
-        threading.Thread.__init__(self)
-        self.parent = parent
-        self.source_line = source_line
-        self.log = logging.getLogger("repoman.PPA.AddThread")
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter('%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
-        handler.setFormatter(formatter)
-        self.log.addHandler(handler)
-        self.log.setLevel(logging.WARNING)
+# Argument signatures of the daemon methods which can be called asynchronously
+PRIVILEGED_SIGNATURES = {
+    'Ping': '',
+    'AddRepo': 's',
+    'AddFullRepo': 'ssssb',
+    'DelRepo': 's',
+    'AddComp': 'ss',
+    'DelComp': 'ss',
+    'AddSuite': 'ss',
+    'DelSuite': 'ss',
+    'SetSource': 'sb',
+    'SetModifiedRepo': 'sbbssss',
+    'ApplyTransaction': 'a(sss)',
+    'SetTraceId': 's',
+    'GetTraceSpans': 's',
+}
 
-    def run(self):
-        self.log.info("Adding PPA %s" % (self.source_line))
-        privileged_object.AddRepo(self.source_line)
-        repo = Repo()
-        isv_list = repo.get_sources()
-        GObject.idle_add(self.parent.parent.stack.list_all.generate_entries, isv_list)
-        GObject.idle_add(self.parent.parent.stack.list_all.view.set_sensitive, True)
-        GObject.idle_add(self.parent.parent.hbar.spinner.stop)
+# Calls which aren't worth tracing
+UNTRACED_METHODS = ('Ping', 'SetTraceId', 'GetTraceSpans')
 
-    def throw_error(self, message):
-        GObject.idle_add(self.parent.parent.stack.list_all.throw_error_dialog,
-                         message, "error")
+def _get_repolib_version():
+    # repolib.VERSION only exists from 1.5, but every release has this
+    try:
+        from repolib.__version__ import __version__
+    except ImportError:
+        return None
+    return __version__
+
+SOURCE_CACHE_FILE = get_cache_file('sources.json')
+# Cached summaries are only trusted if they came from the same parser; if
+# its version can't be told, the cache isn't used at all.
+REPOLIB_VERSION = _get_repolib_version()
+SOURCE_CACHE_TAG = None
+if REPOLIB_VERSION:
+    SOURCE_CACHE_TAG = 'repolib-{}'.format(REPOLIB_VERSION)
+
+class Lazy:
+    """
+    Holds a value which is only built by FACTORY the first time it's needed,
+    then shared by everyone after that.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.value = None
+        self.lock = threading.Lock()
+
+    def get(self):
+        if self.value is None:
+            with self.lock:
+                if self.value is None:
+                    self.value = self.factory()
+        return self.value
+
+def _open_system_bus():
+    # Replies to asynchronous calls are delivered through the GLib main loop,
+    # and blocking calls can also come from scheduler jobs.
+    dbus.mainloop.glib.threads_init()
+    return dbus.SystemBus(
+        mainloop=dbus.mainloop.glib.DBusGMainLoop()
+    )
+
+def _get_privileged_object():
+    # Getting the object D-Bus-activates the root daemon, so don't do it until
+    # something actually needs to be changed.
+    return system_bus.get().get_object(
+        PRIVILEGED_NAME, PRIVILEGED_PATH
+    )
+
+system_bus = Lazy(_open_system_bus)
+privileged = Lazy(_get_privileged_object)
+source_index = SourceIndex(
+    scan_source, SOURCES_DIR,
+    dump=SourceSummary.to_dict,
+    load=SourceSummary.from_dict
+)
+
+def _call_async(method, args, reply_handler, error_handler, timeout=-1):
+    return system_bus.get().call_async(
+        PRIVILEGED_NAME, PRIVILEGED_PATH, PRIVILEGED_INTERFACE,
+        method, PRIVILEGED_SIGNATURES[method], args,
+        reply_handler, error_handler,
+        timeout=timeout
+    )
+
+def _ignore_reply(*result):
+    pass
+
+def _on_trace_error(error):
+    logging.getLogger('repoman.Repo').debug('Tracing call failed: %s', error)
+
+def set_trace_id(trace_id):
+    """
+    Tells the daemon to record the spans of the calls which follow under
+    TRACE_ID. Calls on one connection are handled in order, so this doesn't
+    need to wait for a reply.
+    """
+    _call_async('SetTraceId', (trace_id,), _ignore_reply, _on_trace_error)
+
+def collect_trace(trace_id):
+    """
+    Fetches the daemon's spans for TRACE_ID and writes them to the trace.
+    """
+    _call_async('GetTraceSpans', (trace_id,),
+                tracer.record_daemon_spans, _on_trace_error)
+
+def _parse_ppa_line(line):
+    try:
+        return repolib.PPALine(line, fetch_data=False)
+    except TypeError:
+        # Older releases of repolib have no fetch_data
+        return repolib.PPALine(line)
+
+class PrivilegedCall:
+    """
+    A call to the privileged daemon which doesn't block the main loop.
+
+    REPLY_HANDLER is called with the method's return value and ERROR_HANDLER
+    with the dbus.DBusException, both on the main thread. TIMEOUT is in
+    seconds; None uses the D-Bus default. After cancel(), neither handler
+    is called. The daemon may still have done the work by then.
+
+    When tracing, the call is recorded under TRACE_ID, or a new trace id if
+    none is given, along with the daemon's spans for it.
+    """
+
+    def __init__(self, method, args, reply_handler=None, error_handler=None,
+                 timeout=None, trace_id=None):
+        self.method = method
+        self.args = args
+        self.reply_handler = reply_handler
+        self.error_handler = error_handler
+        self.timeout = timeout
+        self.pending = None
+        self.cancelled = False
+        self.finished = False
+        self.trace_id = None
+        self.started = None
+        if tracer.enabled and not method in UNTRACED_METHODS:
+            self.trace_id = trace_id or tracer.new_trace_id()
+
+        self.log = logging.getLogger('repoman.PrivilegedCall')
+
+    def start(self):
+        self.log.debug('Calling %s%s', self.method, self.args)
+        if self.trace_id:
+            set_trace_id(self.trace_id)
+            self.started = time.time()
+        self.pending = _call_async(
+            self.method, self.args, self._on_reply, self._on_error,
+            timeout=-1 if self.timeout is None else self.timeout
+        )
+        return self
+
+    def cancel(self):
+        """
+        Stops waiting for the reply.
+        """
+        if self.finished or self.cancelled:
+            return
+        self.cancelled = True
+        if self.pending:
+            self.pending.cancel()
+
+    def _on_reply(self, *result):
+        self.finished = True
+        self._finish_trace('reply')
+        if self.cancelled or not self.reply_handler:
+            return
+        if len(result) == 1:
+            result = result[0]
+        self.reply_handler(result)
+
+    def _on_error(self, error):
+        self.finished = True
+        self._finish_trace('error')
+        self.log.warning('%s failed: %s', self.method, error)
+        if self.cancelled or not self.error_handler:
+            return
+        self.error_handler(error)
+
+    def _finish_trace(self, outcome):
+        if self.started is None:
+            return
+        tracer.record(self.trace_id, 'call ' + self.method,
+                      self.started, time.time(), outcome=outcome)
+        collect_trace(self.trace_id)
+
+def warm_up_daemon():
+    """
+    Starts the privileged daemon in the background if it isn't running yet,
+    so it's ready by the time the first change is made. Returns the
+    PrivilegedCall.
+    """
+    log = logging.getLogger('repoman.Repo')
+
+    def on_reply(result):
+        log.debug('Privileged daemon is ready')
+
+    def on_error(error):
+        # Not fatal; the first real call will report the problem
+        log.debug('Could not start the privileged daemon: %s', error)
+
+    return PrivilegedCall(
+        'Ping', (), reply_handler=on_reply, error_handler=on_error
+    ).start()
 
 class Repo:
 
@@ -86,61 +272,49 @@ class Repo:
         handler.setFormatter(formatter)
         self.log.addHandler(handler)
         self.log.setLevel(logging.WARNING)
-        self.system_source = repolib.SystemSource()
 
-        self.system_source.load_from_file()
-    
     def get_os_name(self):
-        try:
-            with open("/etc/os-release") as os_release_file:
-                os_release = os_release_file.readlines()
-                for line in os_release:
-                    parse = line.split('=')
-                    if parse[0] == "NAME":
-                        if parse[1].startswith('"'):
-                            return parse[1][1:-2]
-                        else:
-                            return parse[1][:-1]
-                    else:
-                        continue
-        except FileNotFoundError:
-            return "your OS"
-
-        return "your OS"
+        """
+        Returns the name of the OS, as last loaded by the system model.
+        """
+        return system_model.os_name
     
-    def get_sources(self):
+    def get_sources(self, workers=None):
         """
-        Gets a list of sources from the disk.
+        Gets the extra sources from the disk, as a dict of filename ->
+        SourceSummary.
+
+        WORKERS sets how many threads may be used to read changed files; by
+        default the index decides, and 1 forces serial loading.
         """
         self.log.debug('Doing list')
-        source_obj = repolib.Source()
-        sources_dict = {}
-        sources = glob.glob('{}/*.sources'.format(SOURCES_DIR))
-        for source in sources:
-            suffix = ''
-            markup_open = '<b>'
-            markup_close = '</b>'
-            with open(source) as source_file:
-                for line in source_file:
-                    if 'Enabled: no' in line:
-                        
-                        markup_open = ''
-                        markup_close = ''
-                        suffix = ' <i>Disabled</i>'
-            if not source in SYSTEM_SOURCES:
-                source_obj.load_from_file(source)
-                source_name = "{}{}{}{}".format(
-                    markup_open,
-                    source_obj.name,
-                    markup_close,
-                    suffix
-                )
-                sources_dict[source] = source_name
-        return sources_dict
+        sources = source_index.refresh(workers=workers)
+        if SOURCE_CACHE_TAG:
+            source_index.save_cache(SOURCE_CACHE_FILE, SOURCE_CACHE_TAG)
+        return self._remove_system_sources(sources)
+
+    def get_cached_sources(self):
+        """
+        Gets the list of sources as it was last seen, without touching the
+        sources on disk or waiting for a reload. Call get_sources() afterwards
+        to bring it up to date.
+        """
+        if SOURCE_CACHE_TAG and not source_index.entries:
+            source_index.load_cache(SOURCE_CACHE_FILE, SOURCE_CACHE_TAG)
+        return self._remove_system_sources(source_index.get_results())
+
+    def _remove_system_sources(self, sources):
+        return {
+            source: summary for source, summary in sources.items()
+            if not source in SYSTEM_SOURCES
+        }
     
     def get_source(self, file):
         """
         Returns a repolib.Source object from filename FILE.
+
+        This is the full, editable source; the list only needs the summaries
+        from get_sources().
         """
         source = repolib.Source()
         source.load_from_file(filename=file)
@@ -150,21 +324,20 @@ class Repo:
         """
         Returns a list of suites used by the System Sources.
         """
-        system_suites = self.system_source.suites
-        return system_suites
+        return system_model.suites
 
     def get_system_comps(self):
         """
         Returns a list of components used by System Sources.
         """
-        system_comps = self.system_source.components
-        return system_comps
+        return system_model.components
     
     def get_source_code_enabled(self, source_name='system'):
         """
         Returns TRUE if source code is enabled for REPO.
         """
-
+        if source_name == 'system':
+            return system_model.source_code
         source_check = repolib.Source(filename='{}.sources'.format(source_name))
         source_check.load_from_file()
         self.log.debug('Found types: %s' % source_check.types)
@@ -179,25 +352,75 @@ class Repo:
         """
         Gets the current distro codename.
         """
-        return repolib.util.DISTRO_CODENAME
+        return system_model.codename
     
-    def add_comp_to_source(self, source_name='system', component='main'):
-        privileged_object.AddComp(source_name, component)
-        return 0
+    def call_privileged(self, method, *args, reply_handler=None,
+                        error_handler=None, timeout=None, trace_id=None):
+        """
+        Calls METHOD on the privileged daemon.
+
+        If a REPLY_HANDLER or ERROR_HANDLER is given, the call is made
+        asynchronously and the PrivilegedCall is returned so it can be
+        cancelled. Otherwise this blocks and returns the result. TRACE_ID
+        ties the call to the rest of an operation when tracing.
+        """
+        if reply_handler or error_handler:
+            return PrivilegedCall(
+                method, args,
+                reply_handler=reply_handler,
+                error_handler=error_handler,
+                timeout=timeout,
+                trace_id=trace_id
+            ).start()
+        kwargs = {}
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        if not tracer.enabled or method in UNTRACED_METHODS:
+            return getattr(privileged.get(), method)(*args, **kwargs)
+
+        trace_id = trace_id or tracer.new_trace_id()
+        set_trace_id(trace_id)
+        try:
+            with tracer.span(trace_id, 'call ' + method):
+                return getattr(privileged.get(), method)(*args, **kwargs)
+        finally:
+            collect_trace(trace_id)
+
+    def add_comp_to_source(self, source_name='system', component='main', **kwargs):
+        return self.call_privileged('AddComp', source_name, component, **kwargs)
     
-    def remove_comp_from_source(self, source_name='system', component='main'):
-        privileged_object.DelComp(source_name, component)
-        return 0
+    def remove_comp_from_source(self, source_name='system', component='main', **kwargs):
+        return self.call_privileged('DelComp', source_name, component, **kwargs)
     
-    def add_suite_to_source(self, source_name='system', suite='main'):
-        privileged_object.AddSuite(source_name, suite)
-        return 0
+    def add_suite_to_source(self, source_name='system', suite='main', **kwargs):
+        return self.call_privileged('AddSuite', source_name, suite, **kwargs)
     
-    def remove_suite_from_source(self, source_name='system', suite='main'):
-        privileged_object.DelSuite(source_name, suite)
-        return 0
+    def remove_suite_from_source(self, source_name='system', suite='main', **kwargs):
+        return self.call_privileged('DelSuite', source_name, suite, **kwargs)
     
+    def apply_transaction(self, operations, **kwargs):
+        """
+        Applies a list of (action, filename, value) OPERATIONS in a single
+        privileged call, writing each affected file once.
+
+        Actions are add-comp, del-comp, add-suite, del-suite, set-source and
+        set-enabled (with a value of 'true' or 'false') and remove (which
+        ignores the value). Returns a list of (code, message) results in the
+        same order, where a code of 0 means success.
+        """
+        self.log.debug('ApplyTransaction(%s)' % operations)
+        return self.call_privileged(
+            'ApplyTransaction',
+            dbus.Array(operations, signature='(sss)'),
+            **kwargs
+        )
+
     def add_source(self, dialog):
+        """
+        Adds the source described by DIALOG without waiting for it, then
+        updates the list or shows what went wrong.
+        """
+        list_all = self.parent.parent.stack.list_all
         if dialog.ppa_entry.get_text() == '':
             source_name = dialog.name_entry.get_text()
             source_uris = dialog.uri_entry.get_text()
@@ -213,26 +436,101 @@ class Repo:
                 'code={}'.format(source_code)
             )
             self.log.debug('AddFullRepo(%s)' % fullrepo)
-            privileged_object.AddFullRepo(
-                source_name, source_uris, source_suites, source_components, source_code
+
+            def on_reply(result):
+                list_all.refresh_sources()
+
+            def on_error(error):
+                self.throw_error(error.get_dbus_message() or str(error))
+
+            self.call_privileged(
+                'AddFullRepo',
+                source_name, source_uris, source_suites, source_components,
+                source_code,
+                reply_handler=on_reply,
+                error_handler=on_error
             )
         elif dialog.ppa_entry.get_text() != '': 
             source_line = dialog.ppa_entry.get_text()
-            self.parent.parent.hbar.spinner.start()
-            self.parent.parent.stack.list_all.view.set_sensitive(False)
-            t = AddThread(self.parent, source_line)
-            t.start()
+            list_all.view.set_sensitive(False)
+
+            def on_done(isv_list):
+                list_all.generate_entries(isv_list)
+                list_all.view.set_sensitive(True)
+
+            def on_error(error):
+                list_all.view.set_sensitive(True)
+                self.throw_error(str(error))
+
+            # No key, since merging this with a reload would lose the
+            # error or leave the list insensitive.
+            scheduler.submit(
+                self._add_source_line, source_line,
+                on_done=on_done, on_error=on_error
+            )
+
+    def _add_source_line(self, job, source_line):
+        """
+        Job which adds SOURCE_LINE and returns the updated list of sources.
+        """
+        self.log.info("Adding PPA %s" % (source_line))
+        self.call_privileged('AddRepo', source_line)
+        job.token.check()
+        return self.get_sources()
+
+    def check_source_line(self, job, source_line):
+        """
+        Job which parses SOURCE_LINE the way the daemon will when it's added,
+        without saving anything. PPAs aren't looked up online, except with
+        older versions of repolib which always do.
+
+        Returns a dict with the line, an error message if it couldn't be
+        parsed, the file it would be saved as, the deb822 text it would be
+        saved with, and the names of any known sources with the same URI and
+        suite.
+        """
+        result = {
+            'line': source_line,
+            'error': None,
+            'filename': '',
+            'preview': '',
+            'duplicates': [],
+        }
+        try:
+            if source_line.startswith('ppa:'):
+                source = _parse_ppa_line(source_line)
+            else:
+                source = repolib.DebLine(source_line)
+            result['preview'] = source.make_source_string()
+            filename = source.filename
+        except Exception as err:
+            self.log.debug('Could not parse %s: %s', source_line, err)
+            result['error'] = str(err) or type(err).__name__
+            return result
+        job.token.check()
+
+        if not filename.endswith('.sources'):
+            filename += '.sources'
+        result['filename'] = os.path.join(SOURCES_DIR, filename)
+
+        uris = {uri.rstrip('/') for uri in source.uris}
+        suites = set(source.suites)
+        for summary in source_index.get_results().values():
+            if (suites.intersection(summary.suites)
+                    and uris.intersection(uri.rstrip('/') for uri in summary.uris)):
+                result['duplicates'].append(summary.name)
+        return result
 
-    def remove_source(self, source):
-        privileged_object.DelRepo(source)
+    def remove_source(self, source, **kwargs):
+        return self.call_privileged('DelRepo', source, **kwargs)
     
-    def set_source_code_enabled(self, source_name='system', is_enabled=True):
+    def set_source_code_enabled(self, source_name='system', is_enabled=True, **kwargs):
         """
         Enables or disabled source code for the repo.
         """
-        privileged_object.SetSource(source_name, is_enabled)
+        return self.call_privileged('SetSource', source_name, is_enabled, **kwargs)
     
-    def set_modified_source(self, source):
+    def set_modified_source(self, source, **kwargs):
         source_code_enabled = False
         for type in source.types:
             if type.value == "deb-src":
@@ -249,12 +547,14 @@ class Repo:
         )
         self.log.debug('SetModifiedRepo(%s)' % source_modified)
         
-        privileged_object.SetModifiedRepo(
+        return self.call_privileged(
+            'SetModifiedRepo',
             source.name, source.enabled.get_bool(), source_code_enabled,
             ' '.join(source.uris), ' '.join(source.suites), 
-            ' '.join(source.components), source.filename
+            ' '.join(source.components), source.filename,
+            **kwargs
         )
 
     def throw_error(self, message):
-        GObject.idle_add(self.parent.parent.parent.stack.list_all.throw_error_dialog,
-                         message, "error")
+        dispatcher.post(self.parent.parent.throw_error_dialog,
+                        message, "error")
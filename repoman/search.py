@@ -0,0 +1,105 @@
+#!/usr/bin/python3
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+import bisect
+import re
+
+TOKEN_RE = re.compile(r'[^\W_]+')
+
+def tokenize(text):
+    """
+    Splits TEXT into lower-case words, so "ppa.launchpad.net/system76" gives
+    ppa, launchpad, net and system76.
+    """
+    return set(TOKEN_RE.findall(text.lower()))
+
+class SearchIndex:
+    """
+    Maps the words in each item's text to the item's key.
+
+    A query matches the items which have, for every word in the query, some
+    word starting with it. Lookups use a sorted list of the known words, so
+    they cost a bisect per query word rather than a scan of every item.
+    """
+
+    def __init__(self):
+        self.tokens = {}
+        self.keys = {}
+        self.sorted_tokens = []
+        self.sorted_dirty = False
+
+    def update(self, key, texts):
+        """
+        Indexes KEY under the words found in the strings in TEXTS, replacing
+        whatever it was indexed under before.
+        """
+        tokens = set()
+        for text in texts:
+            tokens |= tokenize(text)
+        old_tokens = self.keys.get(key, set())
+        if tokens == old_tokens:
+            return
+        for token in old_tokens - tokens:
+            self._discard(token, key)
+        for token in tokens - old_tokens:
+            if not token in self.tokens:
+                self.tokens[token] = set()
+                self.sorted_dirty = True
+            self.tokens[token].add(key)
+        self.keys[key] = tokens
+
+    def remove(self, key):
+        for token in self.keys.pop(key, ()):
+            self._discard(token, key)
+
+    def _discard(self, token, key):
+        keys = self.tokens[token]
+        keys.discard(key)
+        if not keys:
+            del self.tokens[token]
+            self.sorted_dirty = True
+
+    def search(self, query):
+        """
+        Returns the set of keys matching QUERY, or None if the query is empty
+        and everything matches.
+        """
+        terms = tokenize(query)
+        if not terms:
+            return None
+        if self.sorted_dirty:
+            self.sorted_tokens = sorted(self.tokens)
+            self.sorted_dirty = False
+
+        result = None
+        # Narrow down with the longest (most specific) words first
+        for term in sorted(terms, key=len, reverse=True):
+            matches = set()
+            start = bisect.bisect_left(self.sorted_tokens, term)
+            for index in range(start, len(self.sorted_tokens)):
+                token = self.sorted_tokens[index]
+                if not token.startswith(term):
+                    break
+                matches |= self.tokens[token]
+            result = matches if result is None else result & matches
+            if not result:
+                break
+        return result
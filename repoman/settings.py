@@ -26,6 +26,9 @@ gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk
 
 from .repo import Repo
+from .model import system_model
+from .changes import SourceWidgets
+from .profiling import profiled
 
 import gettext
 gettext.bindtextdomain('repoman', '/usr/share/repoman/po')
@@ -36,9 +39,8 @@ class Settings(Gtk.Box):
 
     def __init__(self, parent):
         Gtk.Box.__init__(self, False, 0)
-        self.handlers = {}
+        self.source_widgets = SourceWidgets()
         self.repo = Repo()
-        self.os_name = self.repo.get_os_name()
         self.parent = parent
         self.log = logging.getLogger('repoman.Settings')
         handler = logging.StreamHandler()
@@ -48,15 +50,13 @@ class Settings(Gtk.Box):
         self.log.setLevel(logging.WARNING)
         self.log.debug('Loaded settings!')
 
-        self.system_comps = self.repo.get_system_comps()
-        self.system_source_code = self.repo.get_source_code_enabled(
-            source_name='system'
-        )
-        self.log.debug('System source code enabled: %s' % self.system_source_code)
-        self.codename = self.repo.get_codename()
+        # The page is shown straight away with everything switched off and
+        # insensitive, and filled in from the system model when it's loaded.
+        self.os_name = system_model.os_name
+        self.system_comps = []
+        self.system_source_code = False
+        self.codename = None
         self.proposed_updates = False
-        if '{}-proposed'.format(self.codename) in self.repo.get_system_suites():
-            self.proposed_updates = True
 
         settings_grid = Gtk.Grid()
         settings_grid.set_margin_left(12)
@@ -72,10 +72,10 @@ class Settings(Gtk.Box):
         Gtk.StyleContext.add_class(sources_title.get_style_context(), "h2")
         settings_grid.attach(sources_title, 0, 0, 1, 1)
 
-        sources_label = Gtk.Label(_("Official sources are those provided by %s and its developers. It's recommended to leave these sources enabled.") % self.os_name)
-        sources_label.set_line_wrap(True)
-        sources_label.set_halign(Gtk.Align.START)
-        settings_grid.attach(sources_label, 0, 1, 1, 1)
+        self.sources_label = Gtk.Label(_("Official sources are those provided by %s and its developers. It's recommended to leave these sources enabled.") % self.os_name)
+        self.sources_label.set_line_wrap(True)
+        self.sources_label.set_halign(Gtk.Align.START)
+        settings_grid.attach(self.sources_label, 0, 1, 1, 1)
 
         self.checks_grid = Gtk.Grid()
         self.checks_grid.set_margin_left(36)
@@ -85,6 +85,7 @@ class Settings(Gtk.Box):
         self.checks_grid.set_column_spacing(12)
         self.checks_grid.set_halign(Gtk.Align.FILL)
         self.checks_grid.set_hexpand(True)
+        self.checks_grid.set_sensitive(False)
         settings_grid.attach(self.checks_grid, 0, 2, 1, 1)
 
         self.main_label = Gtk.Label('Officially supported software (main)')
@@ -123,12 +124,9 @@ class Settings(Gtk.Box):
             'restricted': self.restricted_switch,
             'multiverse': self.multiverse_switch
         }
-        self.setup_comps()
 
-        self.main_switch.connect('state-set', self.on_switch_toggled)
-        self.universe_switch.connect('state-set', self.on_switch_toggled)
-        self.restricted_switch.connect('state-set', self.on_switch_toggled)
-        self.multiverse_switch.connect('state-set', self.on_switch_toggled)
+        for switch in self.component_switches.values():
+            self.source_widgets.watch(switch, 'state-set', self.on_switch_toggled)
 
 
         self.checks_grid.attach(self.main_switch, 1, 0, 1, 1)
@@ -149,6 +147,7 @@ class Settings(Gtk.Box):
         self.developer_grid = Gtk.Grid()
         self.developer_grid.set_column_spacing(12)
         self.developer_grid.set_halign(Gtk.Align.FILL)
+        self.developer_grid.set_sensitive(False)
 
         developer_label = Gtk.Label(_("These options are those which are primarily of interest to developers."))
         developer_label.set_halign(Gtk.Align.START)
@@ -159,15 +158,13 @@ class Settings(Gtk.Box):
 
         self.source_check = Gtk.CheckButton(label=_('Include Source Code'))
         self.source_check.set_halign(Gtk.Align.START)
-        self.source_check.set_active(self.system_source_code)
-        self.source_check.connect('toggled', self.on_source_toggled)
+        self.source_widgets.watch(self.source_check, 'toggled', self.on_source_toggled)
         proposed_label = Gtk.Label(_('Unstable Updates (proposed)'))
         proposed_label.set_halign(Gtk.Align.START)
         proposed_label.set_hexpand(True)
         self.proposed_switch = Gtk.Switch()
         self.proposed_switch.set_halign(Gtk.Align.END)
-        self.proposed_switch.set_active(self.proposed_updates)
-        self.proposed_switch.connect('state-set', self.on_proposed_toggled)
+        self.source_widgets.watch(self.proposed_switch, 'state-set', self.on_proposed_toggled)
         self.proposed_switch.set_hexpand(True)
 
 
@@ -178,53 +175,64 @@ class Settings(Gtk.Box):
         self.developer_grid.attach(self.proposed_switch, 1, 2, 1, 1)
         
         self.show_all()
+        system_model.subscribe(self.on_system_changed)
     
+    def on_system_changed(self, model):
+        """
+        Fills in the page whenever the system model is (re)loaded.
+        """
+        self.os_name = model.os_name
+        self.codename = model.codename
+        self.system_comps = model.components
+        self.system_source_code = model.source_code
+        self.log.debug('System source code enabled: %s' % self.system_source_code)
+        self.proposed_updates = False
+        if '{}-proposed'.format(self.codename) in model.suites:
+            self.proposed_updates = True
+
+        self.sources_label.set_text(_("Official sources are those provided by %s and its developers. It's recommended to leave these sources enabled.") % self.os_name)
+        self.setup_comps()
+        self.source_widgets.set_state(self.source_check, self.system_source_code)
+        self.source_widgets.set_state(self.proposed_switch, self.proposed_updates)
+        self.checks_grid.set_sensitive(True)
+        self.developer_grid.set_sensitive(True)
+
+    @profiled
     def on_source_toggled(self, widget):
         """Handler for source-code check."""
-        self.repo.set_source_code_enabled(
-            source_name='system',
-            is_enabled=widget.get_active()
+        self.source_widgets.stage(
+            widget, 'set-source', 'true' if widget.get_active() else 'false'
         )
     
+    @profiled
     def on_proposed_toggled(self, widget, data=None):
         """ Handler for proposed switch. """
+        suite = '{}-proposed'.format(self.codename)
         if not widget.get_active():
             self.log.debug('Disabling Proposed')
-            self.repo.remove_suite_from_source(
-                source_name='system',
-                suite='{}-proposed'.format(self.codename)
-            )
+            self.source_widgets.stage(widget, 'del-suite', suite)
         else:
             self.log.debug('Enabling Proposed')
-            self.repo.add_suite_to_source(
-                source_name='system',
-                suite='{}-proposed'.format(self.codename)
-            )
+            self.source_widgets.stage(widget, 'add-suite', suite)
     
+    @profiled
     def on_switch_toggled(self, widget, data=None):
         """
         Handler for switches.
         """
         if not widget.get_active():
             self.log.debug('Disabling system component: %s' % widget.component_name)
-            self.repo.remove_comp_from_source(
-                source_name='system',
-                component=widget.component_name
-            )
+            self.source_widgets.stage(widget, 'del-comp', widget.component_name)
         else:
             self.log.debug('Enabling system component: %s' % widget.component_name)
-            self.repo.add_comp_to_source(
-                source_name='system',
-                component=widget.component_name
-            )
+            self.source_widgets.stage(widget, 'add-comp', widget.component_name)
 
     def setup_comps(self):
         """
-        Sets the initial state of the switches in the window.
+        Sets the state of the switches in the window.
         """
-        
         for i in self.system_comps:
             self.log.debug('Got component: %s' % i)
-            if i in self.component_switches:
-                self.component_switches[i].set_active(True)
+        for name, switch in self.component_switches.items():
+            self.source_widgets.set_state(switch, name in self.system_comps)
     
\ No newline at end of file
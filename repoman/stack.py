@@ -21,10 +21,16 @@
 
 import gi
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk
+from gi.repository import Gtk, GLib
 from .settings import Settings
 from .updates import Updates
 from .list import List
+from .jobs import scheduler, PRIORITY_LOW
+from .model import system_model
+from .changes import change_set
+from .changebar import ChangeBar
+from .repo import Repo
+from .timeline import timeline
 
 FLATPAK_SUPPORT = False
 try:
@@ -42,27 +48,130 @@ gettext.textdomain("repoman")
 _ = gettext.gettext
 
 class Stack(Gtk.Box):
+    """
+    The pages of the window.
+
+    Each page starts out as an empty placeholder and is only built the first
+    time it's shown, so startup only pays for the visible page. Once the
+    window is idle, the page after the visible one is built ahead of time.
+
+    Nothing is read from the disk while building the pages. The system source
+    is loaded by the shared system model, which the pages subscribe to, and
+    the extra sources are warmed up by a job.
+    """
+
+    prefetch = True
 
     def __init__(self, parent):
         Gtk.Box.__init__(self, orientation=Gtk.Orientation.VERTICAL, spacing=6)
         self.parent = parent
+        self.page_names = []
+        self.page_classes = {}
+        self.placeholders = {}
+        self.pages = {}
+        self.prefetch_source = None
+        self.repo = Repo(parent=self)
 
         self.stack = Gtk.Stack()
         self.stack.set_transition_type(Gtk.StackTransitionType.SLIDE_LEFT_RIGHT)
         self.stack.set_transition_duration(300)
 
-        self.setting = Settings(self)
-        self.updates = Updates(self)
-        self.list_all = List(self)
+        self.add_page("settings", _("Settings"), Settings)
+        self.add_page("updates", _("Updates"), Updates)
+        self.add_page("list", _("Extra Sources"), List)
         if FLATPAK_SUPPORT:
-            self.flatpak_list = FlatpakList(self)
+            self.add_page("flatpak", _("Flatpak Sources"), FlatpakList)
 
-        self.stack.add_titled(self.setting, "settings", _("Settings"))
-        self.stack.add_titled(self.updates, "updates", _("Updates"))
-        self.stack.add_titled(self.list_all, "list", _("Extra Sources"))
-        if FLATPAK_SUPPORT:
-            self.stack.add_titled(self.flatpak_list, "flatpak", _("Flatpak Sources"))
+        with timeline.span('build first page'):
+            self.get_page(self.page_names[0])
+        # Low priority idles run after the window has been drawn
+        self.schedule_prefetch(self.page_names[0])
+        self.stack.connect('notify::visible-child-name', self.on_page_changed)
 
+        self.change_bar = ChangeBar()
+        self.pack_start(self.change_bar, False, False, 0)
         self.pack_start(self.stack, True, True, 0)
+        change_set.connect('failed', self.on_changes_failed)
+
+        system_model.connect('failed', self.on_load_failed)
+        with timeline.span('start system model'):
+            system_model.start()
+        # Warm up the source index for when the Extra Sources page is built
+        scheduler.submit(self.load_sources, priority=PRIORITY_LOW)
+
+    def load_sources(self, job):
+        with timeline.span('load sources', 'job'):
+            return self.repo.get_sources()
+
+    def on_load_failed(self, model, error):
+        self.parent.throw_error_dialog(
+            _("Could not load the system sources: %s") % error, "error"
+        )
+
+    def on_changes_failed(self, change_set, message):
+        self.parent.throw_error_dialog(message, "error")
+
+    def add_page(self, name, title, page_class):
+        """
+        Adds an empty placeholder for the page NAME, to be filled with a
+        PAGE_CLASS when it's first needed.
+        """
+        placeholder = Gtk.Box()
+        self.stack.add_titled(placeholder, name, title)
+        self.page_names.append(name)
+        self.page_classes[name] = page_class
+        self.placeholders[name] = placeholder
+
+    def get_page(self, name):
+        """
+        Returns the page NAME, building it first if needed.
+        """
+        if not name in self.pages:
+            with timeline.span('{}()'.format(self.page_classes[name].__name__)):
+                page = self.page_classes[name](self)
+            self.pages[name] = page
+            self.placeholders[name].pack_start(page, True, True, 0)
+            page.show_all()
+        return self.pages[name]
+
+    def on_page_changed(self, stack, pspec):
+        name = stack.get_visible_child_name()
+        if name:
+            self.get_page(name)
+            self.schedule_prefetch(name)
+
+    def schedule_prefetch(self, name):
+        """
+        Builds the page after NAME once there's nothing else to do.
+        """
+        if not self.prefetch or self.prefetch_source:
+            return
+        index = self.page_names.index(name)
+        for next_name in self.page_names[index + 1:]:
+            if not next_name in self.pages:
+                self.prefetch_source = GLib.idle_add(
+                    self.prefetch_page, next_name,
+                    priority=GLib.PRIORITY_LOW
+                )
+                return
+
+    def prefetch_page(self, name):
+        self.prefetch_source = None
+        self.get_page(name)
+        return False
+
+    @property
+    def setting(self):
+        return self.get_page("settings")
+
+    @property
+    def updates(self):
+        return self.get_page("updates")
 
+    @property
+    def list_all(self):
+        return self.get_page("list")
 
+    @property
+    def flatpak_list(self):
+        return self.get_page("flatpak")
@@ -0,0 +1,174 @@
+#!/usr/bin/python3
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+
+# Set to 1 to trace startup into the cache directory, or to a file name
+TRACE_ENV = 'REPOMAN_TRACE_STARTUP'
+TRACE_OPTION = '--trace-startup'
+
+log = logging.getLogger('repoman.Timeline')
+handler = logging.StreamHandler()
+formatter = logging.Formatter('%(asctime)s %(name)-12s %(levelname)-8s %(message)s')
+handler.setFormatter(formatter)
+log.addHandler(handler)
+# Only used when tracing was asked for, so say where the trace went
+log.setLevel(logging.INFO)
+
+def get_cache_file(name):
+    """
+    Returns the path of NAME in Repoman's cache directory.
+    """
+    # Imported here, since startup is traced from before gi is loaded
+    from gi.repository import GLib
+    return os.path.join(GLib.get_user_cache_dir(), 'repoman', name)
+
+class _NullSpan:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+NULL_SPAN = _NullSpan()
+
+class Span:
+    """
+    Calls RECORD(start, end, error) on the way out, with the CLOCK times it
+    was entered and left and the exception it was left by, if any.
+    """
+
+    def __init__(self, record, clock=time.monotonic):
+        self.record = record
+        self.clock = clock
+        self.start = None
+
+    def __enter__(self):
+        self.start = self.clock()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.record(self.start, self.clock(), exc_value)
+        return False
+
+class Timeline:
+    """
+    Records how long each phase of startup takes, when asked to.
+
+    Tracing is off unless REPOMAN_TRACE_STARTUP is set or --trace-startup is
+    passed. While it's off, span() hands back a shared object which does
+    nothing. When it's on, the events are written at exit as a Chrome trace
+    (load it in chrome://tracing or Perfetto).
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.output_file = None
+        self.started = None
+        self.origin = time.monotonic()
+        self.events = []
+        self.lock = threading.Lock()
+
+    def enable(self, output_file=None):
+        if self.enabled:
+            return
+        # Without an OUTPUT_FILE, one is picked in the cache directory when
+        # the trace is written.
+        self.output_file = output_file
+        self.started = time.strftime('%Y%m%d-%H%M%S')
+        self.enabled = True
+        atexit.register(self.write)
+
+    def span(self, name, category='startup'):
+        """
+        Returns a context manager which records the time spent inside it.
+        """
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(
+            lambda start, end, error: self.add_span(name, start, end, category)
+        )
+
+    def add_span(self, name, start, end, category='startup'):
+        self._add({
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': self._micros(start),
+            'dur': int((end - start) * 1000000),
+        })
+
+    def mark(self, name, category='startup'):
+        """
+        Records that NAME happened now.
+        """
+        if not self.enabled:
+            return
+        self._add({
+            'name': name,
+            'cat': category,
+            'ph': 'i',
+            's': 'p',
+            'ts': self._micros(time.monotonic()),
+        })
+
+    def _micros(self, timestamp):
+        return int((timestamp - self.origin) * 1000000)
+
+    def _add(self, event):
+        event['pid'] = os.getpid()
+        event['tid'] = threading.get_ident()
+        with self.lock:
+            self.events.append(event)
+
+    def write(self):
+        """
+        Writes the events recorded so far to the output file.
+        """
+        with self.lock:
+            events = list(self.events)
+        data = {'traceEvents': events, 'displayTimeUnit': 'ms'}
+        if not self.output_file:
+            self.output_file = get_cache_file(
+                'startup-{}.json'.format(self.started)
+            )
+        try:
+            os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
+            with open(self.output_file, 'w') as trace_file:
+                json.dump(data, trace_file)
+        except OSError as err:
+            log.warning('Could not write startup trace %s: %s',
+                        self.output_file, err)
+            return
+        log.info('Startup trace written to %s', self.output_file)
+
+timeline = Timeline()
+
+if os.environ.get(TRACE_ENV):
+    value = os.environ[TRACE_ENV]
+    timeline.enable(None if value == '1' else value)
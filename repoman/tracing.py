@@ -0,0 +1,126 @@
+#!/usr/bin/python3
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+
+from .timeline import get_cache_file, NULL_SPAN, Span
+
+# Set to 1 to trace privileged operations into the cache directory, or to a
+# file name
+TRACE_ENV = 'REPOMAN_TRACE'
+
+class Tracer:
+    """
+    Follows privileged operations from the GUI into the daemon and back.
+
+    Each operation gets a trace id, which is handed to the daemon before the
+    calls made for it, so the daemon's spans (polkit check, load, mutate,
+    save) can be collected and written next to the client's (the call, the
+    reply and the UI refresh). Spans from both sides are appended to one
+    JSONL file, one span per line with wall-clock start and end times;
+    grouping the lines by "trace" gives a timeline per operation.
+
+    Tracing is off unless REPOMAN_TRACE is set. While it's off,
+    new_trace_id() returns None and span() a shared object which does
+    nothing.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.output_file = None
+        self.lock = threading.Lock()
+
+    def enable(self, output_file=None):
+        self.output_file = output_file or get_cache_file('trace.jsonl')
+        self.enabled = True
+
+    def new_trace_id(self):
+        if not self.enabled:
+            return None
+        return uuid.uuid4().hex
+
+    def span(self, trace_id, name, **fields):
+        """
+        Returns a context manager which records a span called NAME in the
+        trace TRACE_ID.
+        """
+        if not self.enabled or trace_id is None:
+            return NULL_SPAN
+
+        def record(start, end, error):
+            if error is not None:
+                fields['error'] = str(error)
+            self.record(trace_id, name, start, end, **fields)
+
+        # Wall-clock times, so they line up with the daemon's
+        return Span(record, clock=time.time)
+
+    def record(self, trace_id, name, start, end, **fields):
+        """
+        Writes a client span which ran from START to END.
+        """
+        if not self.enabled or trace_id is None:
+            return
+        span = dict(fields)
+        span.update({
+            'trace': trace_id,
+            'name': name,
+            'side': 'client',
+            'start': start,
+            'end': end,
+            'pid': os.getpid(),
+        })
+        self.write([span])
+
+    def record_daemon_spans(self, data):
+        """
+        Writes the spans the daemon handed back, as JSON.
+        """
+        try:
+            spans = json.loads(data)
+        except ValueError:
+            return
+        if spans:
+            self.write(spans)
+
+    def write(self, spans):
+        lines = ''.join(json.dumps(span) + '\n' for span in spans)
+        with self.lock:
+            try:
+                os.makedirs(os.path.dirname(self.output_file), exist_ok=True)
+                with open(self.output_file, 'a') as trace_file:
+                    trace_file.write(lines)
+            except OSError as err:
+                logging.getLogger('repoman.Tracer').warning(
+                    'Could not write trace %s: %s', self.output_file, err
+                )
+
+tracer = Tracer()
+
+if os.environ.get(TRACE_ENV):
+    value = os.environ[TRACE_ENV]
+    tracer.enable(None if value == '1' else value)
@@ -25,6 +25,9 @@ gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk
 
 from .repo import Repo
+from .model import system_model
+from .changes import SourceWidgets
+from .profiling import profiled
 
 import gettext
 gettext.bindtextdomain('repoman', '/usr/share/repoman/po')
@@ -45,10 +48,10 @@ class Updates(Gtk.Box):
         self.log.debug('Loaded repoman.Updates')
         self.repo = Repo()
         self.parent = parent
-        self.os_name = self.repo.get_os_name()
-        self.handlers = {}
-        self.codename = self.repo.get_codename()
-        self.system_suites = self.repo.get_system_suites()
+        self.source_widgets = SourceWidgets()
+        self.os_name = system_model.os_name
+        self.codename = None
+        self.system_suites = []
 
         updates_grid = Gtk.Grid()
         updates_grid.set_margin_left(12)
@@ -64,11 +67,11 @@ class Updates(Gtk.Box):
         Gtk.StyleContext.add_class(updates_title.get_style_context(), "h2")
         updates_grid.attach(updates_title, 0, 0, 1, 1)
 
-        updates_label = Gtk.Label(_("These sources control how %s checks for updates. It is recommended to leave these sources enabled.") % self.os_name)
+        self.updates_label = Gtk.Label(_("These sources control how %s checks for updates. It is recommended to leave these sources enabled.") % self.os_name)
 
-        updates_label.set_line_wrap(True)
-        updates_label.set_halign(Gtk.Align.START)
-        updates_grid.attach(updates_label, 0, 1, 1, 1)
+        self.updates_label.set_line_wrap(True)
+        self.updates_label.set_halign(Gtk.Align.START)
+        updates_grid.attach(self.updates_label, 0, 1, 1, 1)
 
         self.checks_grid = Gtk.Grid()
         self.checks_grid.set_margin_left(36)
@@ -78,6 +81,7 @@ class Updates(Gtk.Box):
         self.checks_grid.set_column_spacing(12)
         self.checks_grid.set_halign(Gtk.Align.FILL)
         self.checks_grid.set_hexpand(True)
+        self.checks_grid.set_sensitive(False)
         updates_grid.attach(self.checks_grid, 0, 2, 1, 1)
 
         self.security_label = Gtk.Label('Important security updates (-security)')
@@ -108,10 +112,8 @@ class Updates(Gtk.Box):
             '-backports': self.backports_switch
         }
         
-        self.setup_suites()
-        self.security_switch.connect('state-set', self.on_switch_toggled)
-        self.updates_switch.connect('state-set', self.on_switch_toggled)
-        self.backports_switch.connect('state-set', self.on_switch_toggled)
+        for switch in self.suite_switches.values():
+            self.source_widgets.watch(switch, 'state-set', self.on_switch_toggled)
 
         self.checks_grid.attach(self.security_switch, 1, 0, 1, 1)
         self.checks_grid.attach(self.updates_switch, 1, 1, 1, 1)
@@ -144,32 +146,53 @@ class Updates(Gtk.Box):
         auto_check = Gtk.CheckButton.new_with_label(_("Automatically install important security updates."))
         self.noti_grid.attach(auto_check, 0, 1, 1, 1)
 
-        version_check = Gtk.CheckButton.new_with_label(_("Notify about new versions of %s") % self.os_name)
-        self.noti_grid.attach(version_check, 0, 2, 1, 1)
+        self.version_check = Gtk.CheckButton.new_with_label(_("Notify about new versions of %s") % self.os_name)
+        self.noti_grid.attach(self.version_check, 0, 2, 1, 1)
+
+        # Notification settings aren't hooked up yet, so keep them hidden even
+        # when the page is shown.
+        for widget in (self.noti_grid, self.notifications_title,
+                       self.notifications_label):
+            widget.set_no_show_all(True)
+            widget.hide()
+
+        system_model.subscribe(self.on_system_changed)
     
+    def on_system_changed(self, model):
+        """
+        Fills in the page whenever the system model is (re)loaded.
+        """
+        self.os_name = model.os_name
+        self.codename = model.codename
+        self.system_suites = model.suites
+
+        self.updates_label.set_text(_("These sources control how %s checks for updates. It is recommended to leave these sources enabled.") % self.os_name)
+        self.notifications_label.set_text(_("Change how %s notifies you about pending software updates.") % self.os_name)
+        self.version_check.set_label(_("Notify about new versions of %s") % self.os_name)
+        self.setup_suites()
+        self.checks_grid.set_sensitive(True)
+
+    @profiled
     def on_switch_toggled(self, widget, data=None):
         """
         Handler for switches.
         """
+        suite = '{}{}'.format(self.codename, widget.suite_name)
         if not widget.get_active():
             self.log.debug('Disabling system suite: %s' % widget.suite_name)
-            self.repo.remove_suite_from_source(
-                source_name='system',
-                suite='{}{}'.format(self.codename, widget.suite_name)
-            )
+            self.source_widgets.stage(widget, 'del-suite', suite)
         else:
             self.log.debug('Enabling system suite: %s' % widget.suite_name)
-            self.repo.add_suite_to_source(
-                source_name='system',
-                suite='{}{}'.format(self.codename, widget.suite_name)
-            )
+            self.source_widgets.stage(widget, 'add-suite', suite)
     
     def setup_suites(self):
         """
-        Sets the initial state of the switches in the window.
+        Sets the state of the switches in the window.
         """
+        suites = []
         for i in self.system_suites:
             suite = i.replace(self.codename, '')
             self.log.debug('Got suite: %s' % suite)
-            if suite in self.suite_switches:
-                self.suite_switches[suite].set_active(True)
+            suites.append(suite)
+        for name, switch in self.suite_switches.items():
+            self.source_widgets.set_state(switch, name in suites)
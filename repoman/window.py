@@ -22,29 +22,45 @@
 import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, Gdk, GLib
+from .dispatch import dispatcher
 from .headerbar import Headerbar
 from .stack import Stack
+from .timeline import timeline
 
 class Window(Gtk.Window):
 
     def __init__(self):
         Gtk.Window.__init__(self)
 
-        self.hbar = Headerbar(self)
-        self.set_titlebar(self.hbar)
+        with timeline.span('Headerbar()'):
+            self.hbar = Headerbar(self)
+            self.set_titlebar(self.hbar)
 
-        self.stack = Stack(self)
-        self.add(self.stack)
+        with timeline.span('Stack()'):
+            self.stack = Stack(self)
+            self.add(self.stack)
 
         self.hbar.switcher.set_stack(self.stack.stack)
+        dispatcher.attach(self)
 
-        self.screen = Gdk.Screen.get_default()
-        self.css_provider = Gtk.CssProvider()
-        try:
-            self.css_provider.load_from_path('data/style.css')
-        except GLib.Error:
-            self.css_provider.load_from_path('/usr/share/repoman/style.css')
-        self.context = Gtk.StyleContext()
-        self.context.add_provider_for_screen(self.screen, self.css_provider,
-          Gtk.STYLE_PROVIDER_PRIORITY_USER)
+        with timeline.span('load CSS'):
+            self.screen = Gdk.Screen.get_default()
+            self.css_provider = Gtk.CssProvider()
+            try:
+                self.css_provider.load_from_path('data/style.css')
+            except GLib.Error:
+                self.css_provider.load_from_path('/usr/share/repoman/style.css')
+            self.context = Gtk.StyleContext()
+            self.context.add_provider_for_screen(self.screen, self.css_provider,
+              Gtk.STYLE_PROVIDER_PRIORITY_USER)
 
+    def throw_error_dialog(self, message, msg_type):
+        if msg_type == "error":
+            msg_type = Gtk.MessageType.ERROR
+        # Not run(), since this can be called from inside a batch of UI
+        # updates and shouldn't hold up the rest of them.
+        dialog = Gtk.MessageDialog(self, 0, msg_type,
+                                   Gtk.ButtonsType.CLOSE, message)
+        dialog.set_modal(True)
+        dialog.connect('response', lambda dialog, response: dialog.destroy())
+        dialog.show()
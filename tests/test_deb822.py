@@ -0,0 +1,97 @@
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+from repoman.deb822 import scan_source, FLAG_BINARY, FLAG_SOURCE_CODE
+
+SOURCE = """X-Repolib-Name: Pop PPA
+Enabled: yes
+Types: deb deb-src
+URIs: http://ppa.launchpad.net/system76/pop/ubuntu
+Suites: focal
+Components: main
+"""
+
+def scan(text, path='/etc/apt/sources.list.d/test.sources'):
+    return scan_source(path, text)
+
+def test_scan_source():
+    summary = scan(SOURCE)
+    assert summary.name == 'Pop PPA'
+    assert summary.enabled
+    assert summary.flags == FLAG_BINARY | FLAG_SOURCE_CODE
+    assert summary.source_code_enabled
+    assert summary.uris == ('http://ppa.launchpad.net/system76/pop/ubuntu',)
+    assert summary.host == 'ppa.launchpad.net'
+    assert summary.suites == ('focal',)
+    assert summary.components == ('main',)
+
+def test_scan_source_reads_the_file(tmp_path):
+    source_file = tmp_path / 'pop.sources'
+    source_file.write_text(SOURCE)
+    assert scan_source(str(source_file)).name == 'Pop PPA'
+
+def test_commented_enabled_is_ignored():
+    summary = scan('# Enabled: no\n' + SOURCE.replace('Enabled: yes\n', ''))
+    assert summary.enabled
+
+def test_enabled_no():
+    assert not scan(SOURCE.replace('Enabled: yes', 'Enabled: no')).enabled
+
+def test_later_stanzas_are_ignored():
+    summary = scan(SOURCE + '\nX-Repolib-Name: Other\nEnabled: no\n'
+                   'Suites: jammy\n')
+    assert summary.name == 'Pop PPA'
+    assert summary.enabled
+    assert summary.suites == ('focal',)
+
+def test_leading_blank_lines_and_comments():
+    summary = scan('\n# A comment\n\n' + SOURCE)
+    assert summary.name == 'Pop PPA'
+
+def test_continuation_lines():
+    summary = scan(SOURCE.replace(
+        'Components: main\n', 'Components: main\n restricted\n\tuniverse\n'
+    ))
+    assert summary.components == ('main', 'restricted', 'universe')
+
+def test_keys_are_case_insensitive():
+    summary = scan(SOURCE.lower())
+    assert summary.name == 'pop ppa'
+    assert summary.suites == ('focal',)
+
+def test_missing_suites_disables():
+    assert not scan(SOURCE.replace('Suites: focal\n', '')).enabled
+
+def test_missing_uris_disables():
+    summary = scan(SOURCE.replace(
+        'URIs: http://ppa.launchpad.net/system76/pop/ubuntu\n', ''
+    ))
+    assert not summary.enabled
+    assert summary.host == ''
+
+def test_name_defaults_to_file_name():
+    summary = scan(SOURCE.replace('X-Repolib-Name: Pop PPA\n', ''))
+    assert summary.name == 'test'
+
+def test_summary_round_trips():
+    summary = scan(SOURCE)
+    copy = type(summary).from_dict(summary.to_dict())
+    for field in summary.__slots__:
+        assert getattr(copy, field) == getattr(summary, field)
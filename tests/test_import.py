@@ -0,0 +1,59 @@
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+
+import sys
+import time
+import types
+from unittest import mock
+
+import pytest
+
+pytest.importorskip('gi')
+pytest.importorskip('dbus')
+pytest.importorskip('repolib')
+
+def _forget_repoman():
+    for name in list(sys.modules):
+        if name == 'repoman' or name.startswith('repoman.'):
+            del sys.modules[name]
+
+def _fail(name):
+    def fail(*args, **kwargs):
+        raise AssertionError('{} was used while importing'.format(name))
+    return fail
+
+def test_import_repo_is_lazy(record_property):
+    """
+    Importing repoman.repo mustn't open the apt cache or the system bus, and
+    so can't D-Bus-activate the privileged daemon.
+    """
+    fake_apt = types.ModuleType('apt')
+    fake_apt.Cache = mock.Mock(side_effect=_fail('apt.Cache'))
+    _forget_repoman()
+    with mock.patch.dict(sys.modules, {'apt': fake_apt}), \
+            mock.patch('dbus.SystemBus', side_effect=_fail('dbus.SystemBus')) as system_bus:
+        start = time.perf_counter()
+        import repoman.repo
+        elapsed = time.perf_counter() - start
+
+    assert not fake_apt.Cache.called
+    assert not system_bus.called
+    record_property('import_seconds', elapsed)
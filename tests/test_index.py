@@ -0,0 +1,218 @@
+'''
+   Copyright 2017 Mirko Brombin (brombinmirko@gmail.com)
+   Copyright 2017 Ian Santopietro (ian@system76.com)
+
+   This file is part of Repoman.
+
+    Repoman is free software: you can redistribute it and/or modify
+    it under the terms of the GNU General Public License as published by
+    the Free Software Foundation, either version 3 of the License, or
+    (at your option) any later version.
+
+    Repoman is distributed in the hope that it will be useful,
+    but WITHOUT ANY WARRANTY; without even the implied warranty of
+    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+    GNU General Public License for more details.
+
+    You should have received a copy of the GNU General Public License
+    along with Repoman.  If not, see <http://www.gnu.org/licenses/>.
+'''
+
+
+import json
+import os
+
+import pytest
+
+from repoman.index import SourceIndex, CACHE_VERSION
+
+class Parser:
+    """Records which files were parsed."""
+
+    def __init__(self):
+        self.parsed = []
+
+    def __call__(self, path, text):
+        self.parsed.append(os.path.basename(path))
+        return text.strip()
+
+def write(path, text, mtime):
+    path.write_text(text)
+    set_mtime(path, mtime)
+
+def set_mtime(path, mtime):
+    # Set explicitly, so changes are seen however coarse the file system's
+    # timestamps are
+    os.utime(str(path), (mtime, mtime))
+
+@pytest.fixture
+def sources(tmp_path):
+    sources_dir = tmp_path / 'sources.list.d'
+    sources_dir.mkdir()
+    write(sources_dir / 'a.sources', 'a', 1000)
+    write(sources_dir / 'b.sources', 'b', 1000)
+    write(sources_dir / 'ignored.list', 'ignored', 1000)
+    set_mtime(sources_dir, 1000)
+    return sources_dir
+
+def make_index(sources_dir, parser=None):
+    return SourceIndex(parser or Parser(), str(sources_dir), workers=1)
+
+def results(index):
+    return {os.path.basename(path): result
+            for path, result in index.get_results().items()}
+
+def test_refresh_parses_each_file(sources):
+    parser = Parser()
+    index = make_index(sources, parser)
+    index.refresh()
+    assert results(index) == {'a.sources': 'a', 'b.sources': 'b'}
+    assert sorted(parser.parsed) == ['a.sources', 'b.sources']
+    assert index.get(str(sources / 'a.sources')) == 'a'
+
+def test_refresh_without_changes_parses_nothing(sources):
+    parser = Parser()
+    index = make_index(sources, parser)
+    index.refresh()
+    del parser.parsed[:]
+    index.refresh()
+    assert parser.parsed == []
+
+def test_refresh_after_add(sources):
+    parser = Parser()
+    index = make_index(sources, parser)
+    index.refresh()
+    del parser.parsed[:]
+    write(sources / 'c.sources', 'c', 2000)
+    set_mtime(sources, 2000)
+    index.refresh()
+    assert parser.parsed == ['c.sources']
+    assert results(index)['c.sources'] == 'c'
+
+def test_refresh_after_touch(sources):
+    parser = Parser()
+    index = make_index(sources, parser)
+    index.refresh()
+    del parser.parsed[:]
+    set_mtime(sources / 'a.sources', 2000)
+    index.refresh()
+    # The content hash is unchanged, so it isn't parsed again
+    assert parser.parsed == []
+    assert results(index)['a.sources'] == 'a'
+
+def test_refresh_after_edit(sources):
+    parser = Parser()
+    index = make_index(sources, parser)
+    index.refresh()
+    del parser.parsed[:]
+    # Saving over a file doesn't touch the directory
+    write(sources / 'a.sources', 'edited', 2000)
+    index.refresh()
+    assert parser.parsed == ['a.sources']
+    assert results(index)['a.sources'] == 'edited'
+
+def test_refresh_after_delete(sources):
+    index = make_index(sources)
+    index.refresh()
+    (sources / 'b.sources').unlink()
+    set_mtime(sources, 2000)
+    index.refresh()
+    assert results(index) == {'a.sources': 'a'}
+
+def test_refresh_missing_directory(tmp_path):
+    index = make_index(tmp_path / 'missing')
+    assert index.refresh() == {}
+
+def test_invalidate_parses_again(sources):
+    parser = Parser()
+    index = make_index(sources, parser)
+    index.refresh()
+    del parser.parsed[:]
+    index.invalidate()
+    index.refresh()
+    assert sorted(parser.parsed) == ['a.sources', 'b.sources']
+
+def test_parallel_refresh_keeps_order(sources):
+    for i in range(70):
+        write(sources / '{:02}.sources'.format(i), str(i), 1000)
+    set_mtime(sources, 2000)
+    index = SourceIndex(Parser(), str(sources), workers=4)
+    index.refresh()
+    assert results(index)['42.sources'] == '42'
+    assert len(index.get_results()) == 72
+
+def test_cache_round_trip(sources, tmp_path):
+    cache_file = str(tmp_path / 'cache' / 'sources.json')
+    index = make_index(sources)
+    index.refresh()
+    index.save_cache(cache_file, 'tag')
+
+    parser = Parser()
+    cached = make_index(sources, parser)
+    assert cached.load_cache(cache_file, 'tag')
+    assert results(cached) == {'a.sources': 'a', 'b.sources': 'b'}
+    cached.refresh()
+    assert parser.parsed == []
+
+def test_save_cache_only_when_changed(sources, tmp_path):
+    cache_file = tmp_path / 'sources.json'
+    index = make_index(sources)
+    index.refresh()
+    index.save_cache(str(cache_file), 'tag')
+    cache_file.unlink()
+    index.save_cache(str(cache_file), 'tag')
+    assert not cache_file.exists()
+
+def cache_data(sources, cache_file):
+    index = make_index(sources)
+    index.refresh()
+    index.save_cache(str(cache_file), 'tag')
+    return json.loads(cache_file.read_text())
+
+@pytest.mark.parametrize('field, value', [
+    ('version', CACHE_VERSION + 1),
+    ('tag', 'other-tag'),
+    ('dir', '/somewhere/else'),
+])
+def test_cache_rejected_on_mismatch(sources, tmp_path, field, value):
+    cache_file = tmp_path / 'sources.json'
+    data = cache_data(sources, cache_file)
+    data[field] = value
+    cache_file.write_text(json.dumps(data))
+    index = make_index(sources)
+    assert not index.load_cache(str(cache_file), 'tag')
+    assert index.get_results() == {}
+
+def test_cache_rejected_when_malformed(sources, tmp_path):
+    cache_file = tmp_path / 'sources.json'
+    data = cache_data(sources, cache_file)
+    data['entries'] = {'a.sources': {'key': 1}}
+    cache_file.write_text(json.dumps(data))
+    assert not make_index(sources).load_cache(str(cache_file), 'tag')
+    cache_file.write_text('not json')
+    assert not make_index(sources).load_cache(str(cache_file), 'tag')
+
+def test_load_cache_doesnt_wait_for_refresh(sources, tmp_path):
+    cache_file = str(tmp_path / 'sources.json')
+    index = make_index(sources)
+    index.refresh()
+    index.save_cache(cache_file, 'tag')
+
+    cached = make_index(sources)
+    # As if a refresh were running on another thread
+    with cached.lock:
+        assert not cached.load_cache(cache_file, 'tag')
+    assert cached.get_results() == {}
+
+def test_unreadable_file_is_left_out(sources, monkeypatch):
+    real_open = open
+
+    def fake_open(path, *args, **kwargs):
+        if str(path).endswith('b.sources'):
+            raise PermissionError(13, 'Permission denied', path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr('builtins.open', fake_open)
+    index = make_index(sources)
+    index.refresh()
+    assert results(index) == {'a.sources': 'a'}